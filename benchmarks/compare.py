@@ -0,0 +1,49 @@
+"""
+Baseline comparison.
+
+Results are flattened to "section/name/metric" keys. A metric regresses
+when it is worse than the baseline by more than the relative threshold and
+by more than its noise floor (so sub-millisecond jitter on tiny stages does
+not fail a run). Lower is better for every metric except rps.
+"""
+THRESHOLDS = {"seconds": 0.25, "peak_mb": 0.15, "retained_mb": 0.15, "p50_ms": 0.25, "p99_ms": 0.5, "rps": 0.2}
+NOISE_FLOORS = {"seconds": 0.005, "peak_mb": 1.0, "retained_mb": 1.0, "p50_ms": 0.2, "p99_ms": 0.5, "rps": 0}
+HIGHER_IS_BETTER = {"rps"}
+
+
+def flatten(results):
+    metrics = {}
+    for size, report in results.get("refresh", {}).items():
+        for stage, values in report["stages"].items():
+            for metric, value in values.items():
+                metrics[f"refresh/{size}/{stage}/{metric}"] = value
+    for endpoint, values in results.get("endpoints", {}).items():
+        for metric in ("rps", "p50_ms", "p99_ms"):
+            metrics[f"endpoints/{endpoint}/{metric}"] = values[metric]
+    return metrics
+
+
+def compare(current, baseline, scale=1.0):
+    """
+    Returns (regressions, improvements), each a list of
+    {"metric", "baseline", "current", "change"} sorted by change.
+    `scale` multiplies every relative threshold.
+    """
+    now, before = flatten(current), flatten(baseline)
+    regressions, improvements = [], []
+    for key in sorted(now.keys() & before.keys()):
+        metric = key.rsplit("/", 1)[1]
+        old, new = before[key], now[key]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        entry = {"metric": key, "baseline": old, "current": new, "change": round(change, 3)}
+        if abs(new - old) <= NOISE_FLOORS[metric]:
+            continue
+        if worse > THRESHOLDS[metric] * scale:
+            regressions.append(entry)
+        elif worse < -THRESHOLDS[metric] * scale:
+            improvements.append(entry)
+    key = lambda e: -abs(e["change"])
+    return sorted(regressions, key=key), sorted(improvements, key=key)
@@ -0,0 +1,99 @@
+"""
+Endpoint throughput: every service's app is started in-process (lifespan
+included) against StubUpstream and driven through httpx.ASGITransport by a
+fixed number of concurrent clients. No sockets are involved, so the numbers
+measure the handlers, caches and encoding, not the network.
+"""
+import asyncio
+import importlib
+import time
+from contextlib import AsyncExitStack
+
+import httpx
+import numpy as np
+
+from shared.upstream import UPSTREAM
+
+SERVICES = {
+    "core": "core_service.main",
+    "market_info": "market_info_service.main",
+    "charts": "charts_service.main",
+    "technical": "technical_service.main",
+}
+
+ENDPOINTS = {
+    "core": [
+        "/homepage-data", "/index-live", "/subindex-live", "/market-turnover",
+        "/floorsheet?size=100", "/floorsheet/totals", "/floorsheet/symbols", "/floorsheet/brokers",
+        "/dashboard",
+    ],
+    "market_info": ["/announcements", "/ipo/general", "/ipo/general?size=5", "/right-share", "/offerings/all"],
+    "charts": ["/stock-chart/NABIL?time=1Y", "/stock-chart/NABIL?time=5Y", "/stock-chart/NABIL?time=5Y&max_points=200",
+               "/stock-chart/index/1D/NEPSE"],
+    "technical": [
+        "/rsi/all", "/ma/all", "/momentum/all", "/crossovers/all", "/candlesticks/all", "/volume-shockers/all",
+        "/rsi/filter?max=30", "/volume-shockers/filter?level=High",
+        "/screener?where=rsi<40 AND percent_diff<0&sort=-rs_score&limit=20",
+        "/technical/{symbol}?fields=close,rsi,sma50", "/candlesticks/history?days=30", "/crossovers/history?days=90",
+        "/technical/status",
+    ],
+}
+
+
+async def _drive(client, path, requests, concurrency):
+    latencies, errors = [], 0
+
+    async def worker(count):
+        nonlocal errors
+        for _ in range(count):
+            started = time.perf_counter()
+            resp = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            errors += resp.status_code >= 400
+
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in shares if n))
+    wall = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "errors": int(errors),
+        "rps": round(requests / wall, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+async def _wait_ready(technical, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not technical.SNAPSHOT.ready:
+        if time.monotonic() > deadline:
+            raise RuntimeError("technical snapshot did not load from the stub sheet")
+        await asyncio.sleep(0.05)
+
+
+async def run_endpoints(stub, symbol, requests=500, concurrency=16, warmup=20, services=None):
+    """
+    {"<service> <path>": {"requests", "errors", "rps", "p50_ms", "p99_ms"}}.
+    Set TECHNICAL_SNAPSHOT_DIR to a scratch directory before the technical
+    service is first imported, or it persists into technical_service/data.
+    """
+    UPSTREAM.set_transport(stub)
+    results = {}
+    apps = {name: importlib.import_module(module) for name, module in SERVICES.items()}
+    async with AsyncExitStack() as stack:
+        for module in apps.values():
+            await stack.enter_async_context(module.app.router.lifespan_context(module.app))
+        await _wait_ready(apps["technical"])
+        for name in ("market_info", "technical", "charts"):
+            apps["core"].BATCHER.set_transport(name, httpx.ASGITransport(app=apps[name].app))
+
+        for name in services or SERVICES:
+            transport = httpx.ASGITransport(app=apps[name].app)
+            async with httpx.AsyncClient(transport=transport, base_url=f"http://{name}", timeout=60) as client:
+                for path in ENDPOINTS[name]:
+                    path = path.format(symbol=symbol)
+                    await _drive(client, path, warmup, min(concurrency, warmup))
+                    results[f"{name} {path}"] = await _drive(client, path, requests, concurrency)
+    return results
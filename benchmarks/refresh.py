@@ -0,0 +1,96 @@
+"""
+Technical refresh benchmark: wall time and peak traced memory of every
+stage of the snapshot pipeline, then of whole refreshes (full, incremental
+after one new session, save and load of the persisted snapshot).
+
+Each stage is timed `repeat` times and the median kept; memory is measured
+in one extra pass under tracemalloc (which slows the code down, so it is
+never mixed with the timings). numpy and pandas buffers are traced.
+"""
+import statistics
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from technical_service.engine import read_sheet, indicator_universe, compute_indicators, latest_frame, build_tables
+from technical_service.snapshot import Snapshot, build_snapshot, render_payloads
+from technical_service.screener import Screener
+from technical_service.series import SeriesIndex
+from technical_service.events import EventIndex
+from technical_service.persist import save_snapshot, load_snapshot
+
+MB = 1 << 20
+
+
+class _Timer:
+    def __init__(self):
+        self.results = {}
+
+    def __call__(self, name, fn, *args):
+        started = time.perf_counter()
+        value = fn(*args)
+        self.results[name] = time.perf_counter() - started
+        return value
+
+
+class _Memory:
+    def __init__(self):
+        self.results = {}
+
+    def __call__(self, name, fn, *args):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        value = fn(*args)
+        current, peak = tracemalloc.get_traced_memory()
+        self.results[name] = {"peak_mb": round((peak - before) / MB, 1), "retained_mb": round((current - before) / MB, 1)}
+        return value
+
+
+def _pipeline(measure, sheet, previous_sheet):
+    df = measure("parse", read_sheet, BytesIO(sheet))
+    hist = measure("universe", indicator_universe, df)
+    hist, offsets = measure("indicators", compute_indicators, hist)
+    latest = measure("latest", latest_frame, hist, offsets)
+    tables = measure("tables", build_tables, latest)
+    measure("payloads", render_payloads, tables)
+    measure("screener", Screener, tables, latest)
+    measure("series_index", SeriesIndex, hist, offsets)
+    measure("event_index", EventIndex, hist, offsets)
+    del df, hist, latest, tables
+
+    snapshot = measure("refresh_full", build_snapshot, Snapshot(), sheet, True)
+    previous = build_snapshot(Snapshot(), previous_sheet, True)
+    measure("refresh_incremental", build_snapshot, previous, sheet)
+    del previous
+    with tempfile.TemporaryDirectory() as root:
+        measure("persist_save", save_snapshot, snapshot, root)
+        loaded = measure("persist_load", load_snapshot, root)
+        del loaded
+    return snapshot
+
+
+def run_refresh(sheet, previous_sheet, repeat=3):
+    """{stage: {"seconds", "peak_mb", "retained_mb"}} plus row and symbol counts."""
+    timings = []
+    for _ in range(repeat):
+        timer = _Timer()
+        snapshot = _pipeline(timer, sheet, previous_sheet)
+        timings.append(timer.results)
+
+    memory = _Memory()
+    tracemalloc.start()
+    try:
+        _pipeline(memory, sheet, previous_sheet)
+    finally:
+        tracemalloc.stop()
+
+    stages = {}
+    for name in timings[0]:
+        stages[name] = {"seconds": round(statistics.median(t[name] for t in timings), 4), **memory.results[name]}
+    return {
+        "rows": len(snapshot.history),
+        "symbols": len(snapshot.offsets[0]),
+        "sheet_mb": round(len(sheet) / MB, 1),
+        "stages": stages,
+    }
@@ -0,0 +1,156 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run                          # 300 symbols x 1/5/10 years
+    python -m benchmarks.run --years 1 --requests 200
+    python -m benchmarks.run --save-baseline          # store as the new baseline
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --require-baseline       # regression check (CI)
+
+Run from the repository root. Writes the results as JSON (--output) and,
+when a baseline file exists, prints the metrics that moved past their
+thresholds and exits with status 1 on any regression. Baselines are only
+comparable on the machine that recorded them, so none is committed: record
+one with --save-baseline on the machine that runs the checks. With
+--require-baseline a missing baseline is an error (status 2) instead of a
+skipped comparison.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The technical service reads its snapshot directory at import time; keep the
+# benchmark's snapshots out of technical_service/data
+SCRATCH_DIR = tempfile.mkdtemp(prefix="nepsehub-bench-")
+os.environ["TECHNICAL_SNAPSHOT_DIR"] = SCRATCH_DIR
+os.environ["TECHNICAL_SNAPSHOT_MODE"] = "standalone"
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_history, sheet_csv, without_last_day, size_label, symbol_names
+from benchmarks.stubs import StubUpstream
+from benchmarks.refresh import run_refresh
+from benchmarks.endpoints import run_endpoints
+from benchmarks.compare import compare
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _arguments(argv=None):
+    parser = argparse.ArgumentParser(description="NEPSE hub benchmarks")
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--years", default="1,5,10", help="history lengths to generate, comma separated")
+    parser.add_argument("--junk", type=int, default=10, help="extra symbols with digits in their names")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per refresh stage (median kept)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-refresh", action="store_true")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="fail (status 2) when --baseline does not exist instead of skipping the comparison")
+    parser.add_argument("--threshold-scale", type=float, default=1.0,
+                        help="multiplies every regression threshold (see compare.THRESHOLDS)")
+    return parser.parse_args(argv)
+
+
+def _meta(args):
+    return {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "symbols": args.symbols,
+        "years": args.years,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+
+def main(argv=None):
+    args = _arguments(argv)
+    if args.require_baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        # Fail before spending minutes on a run that cannot be checked
+        print(f"❌ No baseline at {args.baseline} (record one with --save-baseline)")
+        return 2
+    warnings.simplefilter("ignore", DeprecationWarning)
+    years = [int(y) for y in args.years.split(",") if y.strip()]
+    results = {"meta": _meta(args), "refresh": {}, "endpoints": {}}
+
+    sheets = {}
+    for year in years:
+        history = make_history(args.symbols, year, args.junk)
+        sheets[year] = (sheet_csv(history), sheet_csv(without_last_day(history)))
+        del history
+
+    if not args.skip_refresh:
+        for year, (sheet, previous) in sheets.items():
+            label = size_label(args.symbols, year)
+            print(f"⏱️ Refresh {label} ...", flush=True)
+            results["refresh"][label] = report = run_refresh(sheet, previous, args.repeat)
+            print(f"   {report['rows']} rows, full {report['stages']['refresh_full']['seconds']}s, "
+                  f"incremental {report['stages']['refresh_incremental']['seconds']}s")
+
+    if not args.skip_endpoints:
+        print("⏱️ Endpoints ...", flush=True)
+        stub = StubUpstream(sheets[years[0]][0])
+        results["endpoints"] = asyncio.run(run_endpoints(
+            stub, symbol_names(1)[0], requests=args.requests, concurrency=args.concurrency))
+        results["upstream_calls"] = dict(stub.calls)
+        for endpoint, values in results["endpoints"].items():
+            print(f"   {endpoint:70s} {values['rps']:9.1f} req/s  p50 {values['p50_ms']:7.2f}ms  p99 {values['p99_ms']:7.2f}ms")
+
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["meta"]["max_rss_mb"] = round(maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"📝 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("ℹ️ No baseline to compare against (use --save-baseline)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = baseline.get("meta", {})
+    if (recorded.get("machine"), recorded.get("cpus")) != (platform.machine(), os.cpu_count()):
+        print(f"⚠️ Baseline was recorded on {recorded.get('machine')} with {recorded.get('cpus')} CPUs; "
+              f"timings may not be comparable")
+    regressions, improvements = compare(results, baseline, args.threshold_scale)
+    for title, entries in (("Improvements", improvements), ("Regressions", regressions)):
+        if entries:
+            print(f"{title}:")
+            for e in entries:
+                print(f"   {e['metric']:90s} {e['baseline']:>10} -> {e['current']:>10} ({e['change']:+.0%})")
+    print(f"{'❌' if regressions else '✅'} {len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,127 @@
+"""
+Local stand-ins for the upstream APIs (Google Sheets, sharehubnepal,
+nepalipaisa, nepsetms and the floorsheet API).
+
+StubUpstream is an httpx transport; install it with
+`UPSTREAM.set_transport(StubUpstream(sheet))` and every service talks to it
+instead of the network. Responses are deterministic and shaped like the real
+ones; `latency` adds a fixed delay per call to mimic a remote host.
+"""
+import asyncio
+import json
+from collections import Counter
+from urllib.parse import urlsplit
+
+import httpx
+
+from shared.constants import (
+    GOOGLE_SHEET_CSV, NEPSELYTICS_URL, NEPSE_TURNOVER_URL, NEPSELYTICS_FLOORSHEET_URL,
+    NEPALIPAISA_INDEX_URL, NEPALIPAISA_SUBINDEX_URL, SHAREHUB_ANNOUNCEMENT_URL, SHAREHUB_OFFERING_URL,
+)
+
+FLOORSHEET_TRADES = 5000
+CHART_POINTS = {"1D": 240, "1W": 1200, "1M": 22, "3M": 66, "6M": 132, "1Y": 240, "5Y": 1200}
+SUB_INDICES = ["Banking", "Development Bank", "Finance", "Hotels And Tourism", "HydroPower", "Investment",
+               "Life Insurance", "Manufacturing And Processing", "Microfinance", "Mutual Fund",
+               "Non Life Insurance", "Others", "Trading"]
+
+
+def _path(url):
+    return urlsplit(url).path
+
+
+def _json(data):
+    return httpx.Response(200, content=json.dumps(data).encode(), headers={"content-type": "application/json"})
+
+
+def _bars(count, start=1_700_000_000, step=86_400):
+    return [{"time": start + i * step, "open": 100 + i % 7, "high": 105 + i % 9, "low": 95 + i % 5,
+             "close": 100 + (i * 7) % 13, "volume": 1000 + i} for i in range(count)]
+
+
+def _trade(i):
+    return {"contractId": 1_000_000 + i, "stockSymbol": f"S{i % 230:03d}", "buyerMemberId": 1 + i % 58,
+            "sellerMemberId": 1 + (i * 7) % 58, "contractQuantity": 10 + i % 90,
+            "contractRate": round(100 + (i % 50) * 1.5, 2), "contractAmount": round((10 + i % 90) * (100 + (i % 50) * 1.5), 2),
+            "businessDate": "2026-09-30", "tradeTime": f"2026-09-30T11:{i // 100 % 60:02d}:00"}
+
+
+class StubUpstream(httpx.AsyncBaseTransport):
+    def __init__(self, sheet=b"", latency=0.0, floorsheet_trades=FLOORSHEET_TRADES):
+        self.sheet = sheet
+        self.latency = latency
+        self.floorsheet_trades = floorsheet_trades
+        self.calls = Counter()
+        self.routes = {
+            _path(GOOGLE_SHEET_CSV): self.google_sheet,
+            _path(NEPSELYTICS_URL): self.homepage,
+            _path(NEPSE_TURNOVER_URL): self.turnover,
+            _path(NEPSELYTICS_FLOORSHEET_URL): self.floorsheet,
+            _path(NEPALIPAISA_INDEX_URL): self.index_live,
+            _path(NEPALIPAISA_SUBINDEX_URL): self.subindex_live,
+            _path(SHAREHUB_ANNOUNCEMENT_URL): self.announcements,
+            _path(SHAREHUB_OFFERING_URL): self.offerings,
+        }
+
+    async def handle_async_request(self, request):
+        self.calls[request.url.host] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path
+        handler = self.routes.get(path)
+        if handler is None and "/price-history/graph/" in path:
+            handler = self.price_history
+        if handler is None and "/daily-graph/index/" in path:
+            handler = self.index_graph
+        if handler is None:
+            return httpx.Response(404)
+        return handler(request)
+
+    def google_sheet(self, request):
+        return httpx.Response(200, content=self.sheet, headers={"content-type": "text/csv"})
+
+    def homepage(self, request):
+        return _json({"success": True, "data": {
+            "indices": [{"index": "NEPSE", "value": 2650.12, "change": 12.3}],
+            "topGainers": [{"symbol": f"S{i:03d}", "ltp": 100 + i, "percentChange": 10 - i * 0.5} for i in range(10)],
+            "topLosers": [{"symbol": f"S{i:03d}", "ltp": 90 + i, "percentChange": -10 + i * 0.5} for i in range(10)],
+        }})
+
+    def turnover(self, request):
+        return _json({"payload": {"totalTurnover": 4_512_345_678.9, "totalTradedShares": 12_345_678, "totalTransactions": 65_432}})
+
+    def index_live(self, request):
+        return _json({"result": [{"indexName": "NEPSE", "indexValue": 2650.12, "change": 12.3, "percentChange": 0.47},
+                                 {"indexName": "Sensitive", "indexValue": 450.5, "change": 1.2, "percentChange": 0.27}]})
+
+    def subindex_live(self, request):
+        return _json({"result": [{"indexName": name, "indexValue": 1000 + i * 37.5, "change": i - 6, "percentChange": (i - 6) / 10}
+                                 for i, name in enumerate(SUB_INDICES)]})
+
+    def floorsheet(self, request):
+        size = int(request.url.params.get("Size", 100))
+        page = int(request.url.params.get("page", 0))
+        start = page * size
+        trades = [_trade(i) for i in range(start, min(self.floorsheet_trades, start + size))]
+        return _json({"data": {"content": trades, "totalAmount": 1_234_567_890.5, "totalQty": 3_456_789,
+                               "totalTrades": self.floorsheet_trades}})
+
+    def announcements(self, request):
+        size = int(request.url.params.get("Size", 12))
+        page = int(request.url.params.get("Page", 1))
+        return _json({"success": True, "data": {"content": [
+            {"id": (page - 1) * size + i, "title": f"Announcement {(page - 1) * size + i}", "symbol": f"S{i:03d}",
+             "publishedDate": "2026-09-30"} for i in range(size)]}})
+
+    def offerings(self, request):
+        size = int(request.url.params.get("size", 30))
+        kind = request.url.params.get("type")
+        return _json({"success": True, "data": {"content": [
+            {"id": i, "type": kind, "for": request.url.params.get("for"), "symbol": f"S{i:03d}",
+             "units": 100_000 + i, "openingDate": "2026-09-28", "closingDate": "2026-10-02"} for i in range(size)]}})
+
+    def price_history(self, request):
+        return _json({"success": True, "data": _bars(CHART_POINTS.get(request.url.params.get("time", "1Y"), 240))})
+
+    def index_graph(self, request):
+        return _json({"success": True, "data": _bars(CHART_POINTS["1D"], step=60)})
@@ -0,0 +1,57 @@
+"""
+Synthetic NEPSE price history in the layout of the Google Sheet export
+(Date, Symbol, Open, High, Low, Close, Volume).
+
+Prices follow a random walk per symbol on the Sunday-Thursday calendar;
+some symbols list later than others, volume has occasional spikes (so the
+volume shocker table is not empty) and a few junk symbols with digits in
+their names (debentures, promoter shares) plus rows with a missing close
+are mixed in, as in the real sheet. Output is deterministic for a seed.
+"""
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 240
+NEPSE_WEEKMASK = "Sun Mon Tue Wed Thu"
+END_DATE = "2026-09-30"
+
+
+def symbol_names(count):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return [letters[i % 26] + letters[(i // 26) % 26] + letters[(i // 676) % 26] + "L" for i in range(count)]
+
+
+def make_history(symbols=300, years=1, junk=10, seed=0):
+    """Synthetic sheet as a DataFrame with the sheet's column names."""
+    rng = np.random.default_rng(seed)
+    days = TRADING_DAYS_PER_YEAR * years
+    dates = pd.bdate_range(end=END_DATE, periods=days, freq="C", weekmask=NEPSE_WEEKMASK).strftime("%Y-%m-%d")
+    names = symbol_names(symbols) + [f"JNK{i}D{80 + i % 10}" for i in range(junk)]
+    frames = []
+    for k, name in enumerate(names):
+        n = int(rng.integers(2, days)) if k % 17 == 0 else days  # late listings
+        close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))) * rng.uniform(1, 20), 2)
+        open_ = np.round(close * (1 + rng.normal(0, 0.01, n)), 2)
+        high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n))), 2)
+        low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n))), 2)
+        volume = rng.integers(100, 100_000, n).astype(float)
+        volume[rng.random(n) < 0.02] *= rng.uniform(2, 5)
+        close[rng.random(n) < 0.001] = np.nan
+        frames.append(pd.DataFrame({
+            "Date": dates[-n:], "Symbol": name, "Open": open_, "High": high,
+            "Low": low, "Close": close, "Volume": np.round(volume),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def sheet_csv(history):
+    return history.to_csv(index=False).encode()
+
+
+def without_last_day(history):
+    """The sheet as it looked one session earlier (for incremental refreshes)."""
+    return history[history["Date"] < history["Date"].max()]
+
+
+def size_label(symbols, years):
+    return f"{symbols}x{years}y"
@@ -0,0 +1,162 @@
+"""
+Server-side downsampling of chart series.
+
+The upstream price-history payloads are not all shaped alike, so the series
+is located leniently: the first list of records (e.g. {"data": [{...}, ...]})
+or the first columnar object (e.g. {"t": [...], "c": [...]}) found breadth
+first. Field names are matched against a few common spellings. Points are
+assumed to be in chronological order, as sharehubnepal returns them.
+
+- line:   Largest-Triangle-Three-Buckets on the close, which keeps the
+          original points that carry the visual shape (peaks, troughs)
+- candle: consecutive bars merged into `max_points` buckets
+          (first open, highest high, lowest low, last close, summed volume)
+
+Everything outside the series (success flags, metadata) is kept as is.
+"""
+import numpy as np
+import pandas as pd
+
+TIME_KEYS = ("time", "t", "date", "timestamp", "x")
+CLOSE_KEYS = ("close", "c", "value", "index", "ltp", "price", "y")
+OPEN_KEYS = ("open", "o")
+HIGH_KEYS = ("high", "h")
+LOW_KEYS = ("low", "l")
+VOLUME_KEYS = ("volume", "v", "qty")
+MODES = ("auto", "line", "candle")
+
+
+def _is_records(node):
+    return isinstance(node, list) and bool(node) and all(isinstance(x, dict) for x in node)
+
+
+def _columnar_size(node):
+    """Length of a columnar series object, or None when `node` is not one."""
+    if not isinstance(node, dict) or not any(isinstance(node.get(k), list) for k in CLOSE_KEYS):
+        return None
+    sizes = {len(v) for v in node.values() if isinstance(v, list)}
+    return sizes.pop() if len(sizes) == 1 else None
+
+
+def _locate(data):
+    """(path, node) of the series in `data`, or (None, None)."""
+    queue = [((), data)]
+    while queue:
+        path, node = queue.pop(0)
+        if _is_records(node) or _columnar_size(node):
+            return path, node
+        if isinstance(node, dict):
+            queue.extend((path + (k,), v) for k, v in node.items())
+    return None, None
+
+
+def _replace(data, path, node):
+    if not path:
+        return node
+    return {**data, path[0]: _replace(data[path[0]], path[1:], node)}
+
+
+class _Series:
+    def __init__(self, node):
+        self.node = node
+        self.records = _is_records(node)
+        fields = node[0] if self.records else node
+        self.size = len(node) if self.records else _columnar_size(node)
+        self.keys = {}
+        for role, names in (("time", TIME_KEYS), ("close", CLOSE_KEYS), ("open", OPEN_KEYS),
+                            ("high", HIGH_KEYS), ("low", LOW_KEYS), ("volume", VOLUME_KEYS)):
+            self.keys[role] = next((k for k in names if k in fields), None)
+
+    def column(self, role):
+        key = self.keys[role]
+        values = [r.get(key) for r in self.node] if self.records else self.node[key]
+        return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy()
+
+    @property
+    def candles(self):
+        return all(self.keys[role] for role in ("open", "high", "low", "close"))
+
+    def _is_column(self, value):
+        return isinstance(value, list) and len(value) == self.size
+
+    def take(self, rows):
+        if self.records:
+            return [self.node[i] for i in rows]
+        return {k: [v[i] for i in rows] if self._is_column(v) else v for k, v in self.node.items()}
+
+    def merge(self, starts, ends, columns):
+        """Buckets [starts, ends) with the given per-bucket columns; other fields from the last bar."""
+        columns = {self.keys[role]: values for role, values in columns.items()}
+        if self.records:
+            return [{**self.node[end - 1], **{k: v[j] for k, v in columns.items()}} for j, end in enumerate(ends)]
+        return {k: columns[k] if k in columns else ([v[end - 1] for end in ends] if self._is_column(v) else v)
+                for k, v in self.node.items()}
+
+
+def lttb(y, n):
+    """Indices of the `n` points of `y` picked by Largest-Triangle-Three-Buckets."""
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.linspace(0, size - 1, n).round().astype(np.int64)
+    y = pd.Series(y).ffill().bfill().fillna(0).to_numpy(dtype=float)
+    x = np.arange(size, dtype=float)
+    # first and last points are kept; the n - 2 buckets in between split [1, size - 1)
+    edges = np.append(np.linspace(1, size - 1, n - 1).astype(np.int64), size)
+    picked = np.empty(n, dtype=np.int64)
+    picked[0], picked[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi, next_hi = edges[i], edges[i + 1], edges[i + 2]
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def _values(array):
+    return [None if isinstance(v, float) and np.isnan(v) else v for v in array.tolist()]
+
+
+def ohlc_buckets(series, n):
+    edges = np.linspace(0, series.size, n + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    high, low = series.column("high"), series.column("low")
+    columns = {
+        "open": _values(series.column("open")[starts]),
+        "high": _values(np.fmax.reduceat(high, starts)),
+        "low": _values(np.fmin.reduceat(low, starts)),
+        "close": _values(series.column("close")[ends - 1]),
+    }
+    if series.keys["volume"]:
+        volume = series.column("volume")
+        if volume.dtype.kind == "f":
+            volume = np.nan_to_num(volume)
+        columns["volume"] = np.add.reduceat(volume, starts).tolist()
+    if series.keys["time"]:
+        times = [r.get(series.keys["time"]) for r in series.node] if series.records else series.node[series.keys["time"]]
+        columns["time"] = [times[i] for i in starts]
+    return series.merge(starts, ends, columns)
+
+
+def downsample(data, max_points, mode="auto"):
+    """
+    Returns (data, original point count) with the series of `data` reduced to
+    at most `max_points` points. Payloads without a recognisable series, or
+    already small enough, come back unchanged.
+    """
+    path, node = _locate(data)
+    if node is None:
+        return data, None
+    series = _Series(node)
+    if series.size <= max_points or series.keys["close"] is None:
+        return data, series.size
+    if mode == "candle" or (mode == "auto" and series.candles):
+        if not series.candles:
+            raise ValueError("Series has no open/high/low/close fields to aggregate into candles")
+        reduced = ohlc_buckets(series, max_points)
+    else:
+        reduced = series.take(lttb(series.column("close"), max_points).tolist())
+    return _replace(data, path, reduced), series.size
@@ -1,10 +1,22 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import httpx
+import json
 import os
+import threading
 import uvicorn
+import sys
+from collections import OrderedDict
 
-app = FastAPI(title="NEPSE Charts Service")
+# Add shared directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.upstream import UPSTREAM, upstream_lifespan
+from shared.metrics import instrument
+from shared.payloads import Payload, serve_payload
+from shared.cache import UpstreamCache
+from shared.market_hours import market_ttl
+from charts_service.downsample import downsample
+
+app = FastAPI(title="NEPSE Charts Service", lifespan=upstream_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,27 +25,98 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument(app)
+
+# Chart payloads are cached per (symbol, range). Intraday ranges move during
+# the session; the long ranges only change once a day. Each entry holds the
+# parsed series and its downsampled versions, so the cache keeps only the
+# CHART_CACHE_ENTRIES most recently used charts.
+CHART_TTL = {
+    "1D": market_ttl(60, 1800),
+    "1W": market_ttl(300, 3600),
+    "1M": market_ttl(900, 6 * 3600),
+    "3M": market_ttl(900, 6 * 3600),
+    "6M": market_ttl(3600, 12 * 3600),
+    "1Y": market_ttl(3600, 12 * 3600),
+    "5Y": market_ttl(3600, 12 * 3600),
+}
+CHART_CACHE_ENTRIES = int(os.environ.get("CHART_CACHE_ENTRIES", 128))
+CHART_CACHE = UpstreamCache("charts", ttl=market_ttl(300, 3600), stale_ttl=300, max_entries=CHART_CACHE_ENTRIES)
+MAX_POINTS_LIMIT = 5000
+DOWNSAMPLED_PER_CHART = 8
+
+class ChartData:
+    """An upstream chart payload plus its recently requested downsampled versions."""
+
+    def __init__(self, body):
+        self.payload = Payload.from_bytes(body)
+        self.data = json.loads(body)
+        self._downsampled = OrderedDict()
+        self._lock = threading.Lock()
+
+    def downsampled(self, max_points, mode):
+        key = (max_points, mode)
+        with self._lock:
+            if key in self._downsampled:
+                self._downsampled.move_to_end(key)
+                return self._downsampled[key]
+        data, points = downsample(self.data, max_points, mode)
+        payload = self.payload if data is self.data else Payload.from_bytes(
+            json.dumps(data, separators=(",", ":")).encode())
+        with self._lock:
+            self._downsampled[key] = (payload, points)
+            if len(self._downsampled) > DOWNSAMPLED_PER_CHART:
+                self._downsampled.popitem(last=False)
+        return payload, points
+
+async def _fetch_chart(url, detail, **kwargs):
+    resp = await UPSTREAM.get(url, headers={"User-Agent": "Mozilla/5.0"}, **kwargs)
+    if resp.status_code != 200:
+        raise HTTPException(status_code=resp.status_code, detail=detail)
+    return ChartData(resp.content)
+
+async def _chart_response(request, key, fetch, ttl, max_points, mode):
+    result = await CHART_CACHE.get(key, fetch, ttl=ttl)
+    chart = result.value
+    if max_points is None:
+        return serve_payload(request, chart.payload, headers=result.headers())
+    try:
+        payload, points = chart.downsampled(max_points, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = result.headers()
+    if points is not None:
+        headers["X-Original-Points"] = str(points)
+    return serve_payload(request, payload, headers=headers)
 
 @app.get("/stock-chart/{symbol}")
 async def stock_chart(
+    request: Request,
     symbol: str, 
-    time: str = Query("1Y", regex="^(1D|1W|1M|3M|6M|1Y|5Y)$")
+    time: str = Query("1Y", regex="^(1D|1W|1M|3M|6M|1Y|5Y)$"),
+    max_points: int = Query(None, ge=2, le=MAX_POINTS_LIMIT),
+    mode: str = Query("auto", regex="^(auto|line|candle)$")
 ):
-    url = f"https://sharehubnepal.com/data/api/v1/price-history/graph/{symbol.upper()}"
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(url, params={"time": time}, headers={"User-Agent": "Mozilla/5.0"})
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=f"Failed to fetch price history for {symbol}")
-    return resp.json()
+    """
+    Price history for one range. With `max_points` the series is downsampled
+    on the server: LTTB on the close (mode=line) or OHLC buckets (mode=candle);
+    "auto" picks candles when the bars carry open/high/low/close.
+    """
+    symbol = symbol.upper()
+    url = f"https://sharehubnepal.com/data/api/v1/price-history/graph/{symbol}"
+    fetch = lambda: _fetch_chart(url, f"Failed to fetch price history for {symbol}", params={"time": time})
+    return await _chart_response(request, ("stock", symbol, time), fetch, CHART_TTL[time], max_points, mode)
 
 @app.get("/stock-chart/index/1D/{symbol}")
-async def index_1d_chart(symbol: str):
+async def index_1d_chart(
+    request: Request,
+    symbol: str,
+    max_points: int = Query(None, ge=2, le=MAX_POINTS_LIMIT),
+    mode: str = Query("auto", regex="^(auto|line|candle)$")
+):
     url = f"https://sharehubnepal.com/live/api/v1/daily-graph/index/{symbol}"
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(url, headers={"User-Agent": "Mozilla/5.0"})
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail="Failed to fetch 1D index graph")
-    return resp.json()
+    fetch = lambda: _fetch_chart(url, "Failed to fetch 1D index graph")
+    return await _chart_response(request, ("index", symbol, "1D"), fetch, CHART_TTL["1D"], max_points, mode)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8003))
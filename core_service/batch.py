@@ -0,0 +1,197 @@
+"""
+Batched reads across the services.
+
+A batch is a list of named resources (see BATCH_RESOURCES) with their query
+params. Every item is resolved concurrently against the service that owns
+it: core resources go through an in-process ASGI transport to this app (no
+socket, same caches), the other services over one pooled keep-alive client
+each. Every item has its own timeout, so a slow upstream only costs its own
+entry ("status": 504) instead of holding up the whole batch; any other
+failure of an item (the upstream answering HTML, a bug in a handler) becomes
+a 502 or 500 entry in the same way.
+
+The item bodies are already JSON; they are spliced into the combined
+response as bytes rather than decoded and re-encoded.
+"""
+import asyncio
+import json
+import os
+import string
+import time
+from urllib.parse import quote
+
+import httpx
+
+SERVICE_URLS = {
+    "market_info": os.environ.get("MARKET_INFO_SERVICE_URL", "http://127.0.0.1:8004"),
+    "technical": os.environ.get("TECHNICAL_SERVICE_URL", "http://127.0.0.1:8002"),
+    "charts": os.environ.get("CHARTS_SERVICE_URL", "http://127.0.0.1:8003"),
+}
+
+# resource name -> (service, path); {placeholders} are filled from the params
+BATCH_RESOURCES = {
+    "homepage-data": ("core", "/homepage-data"),
+    "index-live": ("core", "/index-live"),
+    "subindex-live": ("core", "/subindex-live"),
+    "market-turnover": ("core", "/market-turnover"),
+    "floorsheet-totals": ("core", "/floorsheet/totals"),
+    "floorsheet-brokers": ("core", "/floorsheet/brokers"),
+    "floorsheet-symbols": ("core", "/floorsheet/symbols"),
+    "announcements": ("market_info", "/announcements"),
+    "ipo-general": ("market_info", "/ipo/general"),
+    "ipo-local": ("market_info", "/ipo/local"),
+    "ipo-foreign": ("market_info", "/ipo/foreign"),
+    "right-share": ("market_info", "/right-share"),
+    "fpo": ("market_info", "/fpo"),
+    "mutual-fund-offering": ("market_info", "/mutual-fund-offering"),
+    "debenture-offering": ("market_info", "/debenture-offering"),
+    "offerings": ("market_info", "/offerings/all"),
+    "rsi": ("technical", "/rsi/all"),
+    "ma": ("technical", "/ma/all"),
+    "momentum": ("technical", "/momentum/all"),
+    "crossovers": ("technical", "/crossovers/all"),
+    "candlesticks": ("technical", "/candlesticks/all"),
+    "volume-shockers": ("technical", "/volume-shockers/all"),
+    "volume-shockers-filter": ("technical", "/volume-shockers/filter"),
+    "screener": ("technical", "/screener"),
+    "technical-status": ("technical", "/technical/status"),
+    "technical": ("technical", "/technical/{symbol}"),
+    "stock-chart": ("charts", "/stock-chart/{symbol}"),
+}
+
+# The home screen in one call
+DASHBOARD = [
+    {"resource": "homepage-data"},
+    {"resource": "index-live"},
+    {"resource": "subindex-live"},
+    {"resource": "market-turnover"},
+    {"resource": "floorsheet-totals"},
+    {"resource": "announcements"},
+    {"resource": "ipo-general"},
+    {"resource": "volume-shockers"},
+]
+
+DEFAULT_ITEM_TIMEOUT = float(os.environ.get("BATCH_ITEM_TIMEOUT", 5))
+MAX_ITEM_TIMEOUT = 30
+MAX_BATCH_ITEMS = 20
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _placeholders(path):
+    return [name for _, name, _, _ in string.Formatter().parse(path) if name]
+
+
+def _segment(name, param, value):
+    """One path placeholder value, escaped; rejects anything that could leave its segment."""
+    value = str(value)
+    if not value or "/" in value or "\\" in value or ".." in value:
+        raise BatchError(f"{name}: invalid {param}: {value!r}")
+    return quote(value, safe="")
+
+
+def resolve(item):
+    """(id, service, path, query params, timeout) of one batch item; raises BatchError."""
+    if isinstance(item, str):
+        item = {"resource": item}
+    if not isinstance(item, dict) or "resource" not in item:
+        raise BatchError("Each item needs a resource name")
+    name = item["resource"]
+    if not isinstance(name, str) or name not in BATCH_RESOURCES:
+        raise BatchError(f"Unknown resource: {name}. Use one of: {', '.join(BATCH_RESOURCES)}")
+    service, path = BATCH_RESOURCES[name]
+    params = item.get("params") or {}
+    if not isinstance(params, dict):
+        raise BatchError(f"{name}: params must be an object")
+    params = dict(params)
+    missing = [p for p in _placeholders(path) if p not in params]
+    if missing:
+        raise BatchError(f"{name} needs params: {', '.join(missing)}")
+    path = path.format(**{p: _segment(name, p, params.pop(p)) for p in _placeholders(path)})
+    try:
+        timeout = min(float(item.get("timeout") or DEFAULT_ITEM_TIMEOUT), MAX_ITEM_TIMEOUT)
+    except (TypeError, ValueError):
+        raise BatchError(f"{name}: timeout must be a number of seconds")
+    return str(item.get("id") or name), service, path, params, timeout
+
+
+class Batcher:
+    def __init__(self, app, urls=None):
+        self.app = app
+        self.urls = {**SERVICE_URLS, **(urls or {})}
+        self.transports = {}
+        self._clients = {}
+
+    def set_transport(self, service, transport):
+        """Routes one service through `transport` (e.g. httpx.ASGITransport of its app)."""
+        self.transports[service] = transport
+        self._clients.pop(service, None)
+
+    def client(self, service):
+        client = self._clients.get(service)
+        if client is None:
+            if service == "core":
+                # App errors come back as 500 responses instead of being re-raised here
+                transport = self.transports.get(service) or httpx.ASGITransport(app=self.app, raise_app_exceptions=False)
+                client = httpx.AsyncClient(transport=transport, base_url="http://core")
+            else:
+                client = httpx.AsyncClient(
+                    transport=self.transports.get(service), base_url=self.urls[service],
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                )
+            self._clients[service] = client
+        return client
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    async def _call(self, service, path, params, timeout):
+        started = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(self.client(service).get(path, params=params), timeout)
+            status, body = resp.status_code, resp.content
+            is_json = resp.headers.get("content-type", "").startswith("application/json")
+            error = None if status < 400 else "request failed"
+        except asyncio.TimeoutError:
+            status, body, is_json, error = 504, b"", False, f"timed out after {timeout}s"
+        except httpx.HTTPError as e:
+            status, body, is_json, error = 502, b"", False, f"{type(e).__name__}: {e}"
+        except Exception as e:
+            status, body, is_json, error = 500, b"", False, f"{type(e).__name__}: {e}"
+        return status, body, is_json, error, time.perf_counter() - started
+
+    async def run(self, items):
+        """Resolves `items` concurrently; returns the combined JSON body as bytes."""
+        if not isinstance(items, list) or not items:
+            raise BatchError("items must be a non-empty list")
+        if len(items) > MAX_BATCH_ITEMS:
+            raise BatchError(f"At most {MAX_BATCH_ITEMS} items per batch")
+        resolved = [resolve(item) for item in items]
+        ids = [r[0] for r in resolved]
+        if len(set(ids)) != len(ids):
+            raise BatchError("Item ids must be unique (set `id` when repeating a resource)")
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._call(service, path, params, timeout)
+                                         for _, service, path, params, timeout in resolved))
+        parts, ok = [], 0
+        for (item_id, service, path, _, _), (status, body, is_json, error, elapsed) in zip(resolved, results):
+            ok += status < 400
+            head = {"status": status, "ok": status < 400, "service": service, "path": path,
+                    "elapsed_ms": round(elapsed * 1000, 1)}
+            if error:
+                head["error"] = error
+            if is_json and body:
+                data = body
+            elif body:
+                data = json.dumps(body.decode("utf-8", "replace")).encode()
+            else:
+                data = b"null"
+            parts.append(json.dumps(item_id).encode() + b":" + json.dumps(head)[:-1].encode() + b',"data":' + data + b"}")
+        summary = {"success": ok == len(resolved), "ok": ok, "failed": len(resolved) - ok,
+                   "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+        return json.dumps(summary)[:-1].encode() + b',"results":{' + b",".join(parts) + b"}}"
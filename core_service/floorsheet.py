@@ -0,0 +1,99 @@
+"""
+Floorsheet paging against the nepselytics API.
+
+Pages are fetched concurrently (bounded by FLOORSHEET_CONCURRENCY per call)
+and always handed back in page order; a short or failed page ends the walk.
+"""
+import asyncio
+import json
+from collections import deque
+
+from shared.constants import NEPSELYTICS_FLOORSHEET_URL, DEFAULT_HEADERS
+from shared.upstream import UPSTREAM
+
+FLOORSHEET_PAGE_SIZE = 100
+FLOORSHEET_CONCURRENCY = 4
+FLOORSHEET_HEADERS = {**DEFAULT_HEADERS, "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+
+async def fetch_page(page, order="desc", size=FLOORSHEET_PAGE_SIZE):
+    """Returns the upstream `data` object of one page, or None on a non-200 answer."""
+    params = {"page": page, "Size": size, "order": order}
+    resp = await UPSTREAM.get(NEPSELYTICS_FLOORSHEET_URL, params=params, headers=FLOORSHEET_HEADERS)
+    if resp.status_code != 200:
+        return None
+    return resp.json().get("data", {}) or {}
+
+
+def _content(data):
+    return data.get("content", []) if data else []
+
+
+async def fetch_pages(first, count, order="desc", concurrency=FLOORSHEET_CONCURRENCY):
+    """Fetches `count` pages starting at `first` concurrently; returns their records in order."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(page):
+        async with semaphore:
+            return await fetch_page(page, order)
+
+    results = await asyncio.gather(*(one(first + i) for i in range(count)), return_exceptions=True)
+    records = []
+    for i, data in enumerate(results):
+        if isinstance(data, Exception):
+            if i == 0:
+                raise data
+            break
+        content = _content(data)
+        records.extend(content)
+        if data is None or len(content) < FLOORSHEET_PAGE_SIZE:
+            break
+    return records
+
+
+async def stream_records(first=0, order="desc", limit=None, concurrency=FLOORSHEET_CONCURRENCY):
+    """
+    Yields floorsheet records page by page, starting at page `first`, keeping
+    up to `concurrency` page requests in flight. The first page's totalTrades
+    bounds how many pages are requested; a short page also ends the stream.
+    """
+    data = await fetch_page(first, order)
+    content = _content(data)
+    sent = 0
+    for record in content[:limit]:
+        yield record
+    sent += len(content[:limit])
+    if data is None or len(content) < FLOORSHEET_PAGE_SIZE or (limit is not None and sent >= limit):
+        return
+
+    total = data.get("totalTrades")
+    last_page = (int(total) - 1) // FLOORSHEET_PAGE_SIZE if total else None
+    if limit is not None:
+        needed = first + (limit - 1) // FLOORSHEET_PAGE_SIZE
+        last_page = needed if last_page is None else min(last_page, needed)
+    next_page = first + 1
+    window = deque()
+    try:
+        while True:
+            while len(window) < concurrency and (last_page is None or next_page <= last_page):
+                window.append(asyncio.create_task(fetch_page(next_page, order)))
+                next_page += 1
+            if not window:
+                return
+            data = await window.popleft()
+            content = _content(data)
+            if limit is not None:
+                content = content[:limit - sent]
+            for record in content:
+                yield record
+            sent += len(content)
+            if data is None or len(_content(data)) < FLOORSHEET_PAGE_SIZE or (limit is not None and sent >= limit):
+                return
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def ndjson(records):
+    async for record in records:
+        yield json.dumps(record, separators=(",", ":")).encode() + b"\n"
@@ -0,0 +1,285 @@
+"""
+In-memory intraday floorsheet.
+
+The day's trades are kept column-wise in typed NumPy arrays, with symbols and
+brokers stored as small integer codes. Aggregates (per-symbol quantity,
+amount and trade count, per-broker buy/sell totals and the symbol x broker
+buy/sell matrices used for top buyers/sellers) are updated with np.add.at for
+every ingested batch, so serving them never rescans the trades.
+
+FloorsheetIngester polls the upstream in ascending order starting from the
+page that holds the first trade not stored yet, and keeps only contract ids
+above the highest one seen.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from shared.market_hours import nepal_now, is_market_open
+from core_service.floorsheet import FLOORSHEET_PAGE_SIZE, fetch_page, stream_records
+
+FIELD_ALIASES = {
+    "contract_id": ("contractId", "contract_id", "contractNo", "id"),
+    "symbol": ("stockSymbol", "symbol", "stock"),
+    "buyer": ("buyerMemberId", "buyerBrokerId", "buyer", "buyerBroker"),
+    "seller": ("sellerMemberId", "sellerBrokerId", "seller", "sellerBroker"),
+    "quantity": ("contractQuantity", "quantity", "qty"),
+    "rate": ("contractRate", "rate", "price"),
+    "amount": ("contractAmount", "amount"),
+    "business_date": ("businessDate", "tradeDate", "date"),
+}
+
+FLOORSHEET_POLL_INTERVAL = 15
+FLOORSHEET_IDLE_INTERVAL = 300
+
+
+def _resolve_fields(record):
+    fields = {}
+    for name, aliases in FIELD_ALIASES.items():
+        fields[name] = next((a for a in aliases if a in record), None)
+    return fields
+
+
+def _grow(array, size, fill=0):
+    if len(array) >= size:
+        return array
+    grown = np.full(max(size, 2 * len(array)), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _grow_2d(matrix, rows, cols):
+    if matrix.shape[0] >= rows and matrix.shape[1] >= cols:
+        return matrix
+    grown = np.zeros((max(rows, 2 * matrix.shape[0]), max(cols, 2 * matrix.shape[1])), dtype=matrix.dtype)
+    grown[:matrix.shape[0], :matrix.shape[1]] = matrix
+    return grown
+
+
+class _Codes:
+    """Category codes for symbol / broker names."""
+
+    def __init__(self):
+        self.index = {}
+        self.names = []
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            key = str(value)
+            code = self.index.get(key)
+            if code is None:
+                code = self.index[key] = len(self.names)
+                self.names.append(key)
+            codes[i] = code
+        return codes
+
+    def __len__(self):
+        return len(self.names)
+
+
+class FloorsheetStore:
+    def __init__(self, capacity=1 << 15):
+        self.reset(capacity)
+
+    def reset(self, capacity=1 << 15, business_date=None):
+        self.size = 0
+        self.business_date = business_date
+        self.max_contract = -1
+        self.contract = np.empty(capacity, dtype=np.int64)
+        self.symbol = np.empty(capacity, dtype=np.int32)
+        self.buyer = np.empty(capacity, dtype=np.int32)
+        self.seller = np.empty(capacity, dtype=np.int32)
+        self.quantity = np.empty(capacity, dtype=np.float64)
+        self.rate = np.empty(capacity, dtype=np.float64)
+        self.amount = np.empty(capacity, dtype=np.float64)
+        self.symbols = _Codes()
+        self.brokers = _Codes()
+
+        self.sym_trades = np.zeros(64, dtype=np.int64)
+        self.sym_quantity = np.zeros(64)
+        self.sym_amount = np.zeros(64)
+        self.broker_buy = np.zeros((128, 2))    # columns: quantity, amount
+        self.broker_sell = np.zeros((128, 2))
+        self.pair_buy = np.zeros((64, 128))     # symbol x broker amount
+        self.pair_sell = np.zeros((64, 128))
+
+    def add(self, records):
+        """Appends trades with a contract id above the highest stored one; returns the count added."""
+        if not records:
+            return 0
+        fields = _resolve_fields(records[0])
+        if fields["contract_id"] is None or fields["symbol"] is None:
+            return 0
+
+        get = lambda name, default=0: [r.get(fields[name], default) for r in records] if fields[name] else [default] * len(records)
+        contract = np.array(get("contract_id", -1), dtype=np.int64)
+        keep = contract > self.max_contract
+        contract, unique_idx = np.unique(contract[keep], return_index=True)
+        if len(contract) == 0:
+            return 0
+        rows = np.flatnonzero(keep)[unique_idx]
+        pick = lambda values: [values[i] for i in rows]
+
+        quantity = np.array(pick(get("quantity")), dtype=np.float64)
+        rate = np.array(pick(get("rate")), dtype=np.float64)
+        amount = np.array(pick(get("amount")), dtype=np.float64) if fields["amount"] else quantity * rate
+        symbol = self.symbols.encode(pick(get("symbol", "")))
+        buyer = self.brokers.encode(pick(get("buyer", "")))
+        seller = self.brokers.encode(pick(get("seller", "")))
+
+        n, end = len(contract), self.size + len(contract)
+        for name in ("contract", "symbol", "buyer", "seller", "quantity", "rate", "amount"):
+            setattr(self, name, _grow(getattr(self, name), end))
+        self.contract[self.size:end] = contract
+        self.symbol[self.size:end] = symbol
+        self.buyer[self.size:end] = buyer
+        self.seller[self.size:end] = seller
+        self.quantity[self.size:end] = quantity
+        self.rate[self.size:end] = rate
+        self.amount[self.size:end] = amount
+        self.size = end
+        self.max_contract = int(contract[-1])
+        self._aggregate(symbol, buyer, seller, quantity, amount)
+        return n
+
+    def _aggregate(self, symbol, buyer, seller, quantity, amount):
+        ns, nb = len(self.symbols), len(self.brokers)
+        self.sym_trades = _grow(self.sym_trades, ns)
+        self.sym_quantity = _grow(self.sym_quantity, ns)
+        self.sym_amount = _grow(self.sym_amount, ns)
+        if self.broker_buy.shape[0] < nb:
+            self.broker_buy = _grow_2d(self.broker_buy, nb, 2)
+            self.broker_sell = _grow_2d(self.broker_sell, nb, 2)
+        self.pair_buy = _grow_2d(self.pair_buy, ns, nb)
+        self.pair_sell = _grow_2d(self.pair_sell, ns, nb)
+
+        np.add.at(self.sym_trades, symbol, 1)
+        np.add.at(self.sym_quantity, symbol, quantity)
+        np.add.at(self.sym_amount, symbol, amount)
+        np.add.at(self.broker_buy, (buyer, 0), quantity)
+        np.add.at(self.broker_buy, (buyer, 1), amount)
+        np.add.at(self.broker_sell, (seller, 0), quantity)
+        np.add.at(self.broker_sell, (seller, 1), amount)
+        np.add.at(self.pair_buy, (symbol, buyer), amount)
+        np.add.at(self.pair_sell, (symbol, seller), amount)
+
+    # Aggregate views
+
+    def symbol_summary(self):
+        ns = len(self.symbols)
+        qty, amt = self.sym_quantity[:ns], self.sym_amount[:ns]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(qty > 0, amt / qty, 0.0)
+        order = np.argsort(-amt, kind="stable")
+        return [{
+            "symbol": self.symbols.names[i],
+            "trades": int(self.sym_trades[i]),
+            "quantity": float(qty[i]),
+            "amount": round(float(amt[i]), 2),
+            "vwap": round(float(vwap[i]), 2),
+        } for i in order]
+
+    def broker_summary(self):
+        nb = len(self.brokers)
+        buy, sell = self.broker_buy[:nb], self.broker_sell[:nb]
+        order = np.argsort(-(buy[:, 1] + sell[:, 1]), kind="stable")
+        return [{
+            "broker": self.brokers.names[i],
+            "buy_quantity": float(buy[i, 0]), "buy_amount": round(float(buy[i, 1]), 2),
+            "sell_quantity": float(sell[i, 0]), "sell_amount": round(float(sell[i, 1]), 2),
+            "net_amount": round(float(buy[i, 1] - sell[i, 1]), 2),
+        } for i in order]
+
+    def _top(self, matrix, code, n):
+        row = matrix[code, :len(self.brokers)]
+        top = np.argsort(-row, kind="stable")[:n]
+        total = self.sym_amount[code]
+        return [{
+            "broker": self.brokers.names[b],
+            "amount": round(float(row[b]), 2),
+            "share": round(float(row[b] / total * 100), 2) if total else 0.0,
+        } for b in top if row[b] > 0]
+
+    def symbol_detail(self, symbol, top=5):
+        code = self.symbols.index.get(symbol.upper())
+        if code is None:
+            return None
+        qty, amt = self.sym_quantity[code], self.sym_amount[code]
+        return {
+            "symbol": self.symbols.names[code],
+            "trades": int(self.sym_trades[code]),
+            "quantity": float(qty),
+            "amount": round(float(amt), 2),
+            "vwap": round(float(amt / qty), 2) if qty else 0.0,
+            "top_buyers": self._top(self.pair_buy, code, top),
+            "top_sellers": self._top(self.pair_sell, code, top),
+        }
+
+    def status(self):
+        return {
+            "business_date": self.business_date,
+            "trades": self.size,
+            "symbols": len(self.symbols),
+            "brokers": len(self.brokers),
+            "max_contract_id": self.max_contract if self.size else None,
+        }
+
+
+class FloorsheetIngester:
+    """Background poller feeding a FloorsheetStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.last_poll = None
+        self.last_added = 0
+        self.last_error = None
+        self._task = None
+
+    async def poll(self):
+        store = self.store
+        head = await fetch_page(0, "asc", size=1)
+        if head is None:
+            return 0
+        total = int(head.get("totalTrades") or 0)
+        first = (head.get("content") or [{}])[0]
+        date_field = _resolve_fields(first)["business_date"]
+        business_date = str(first[date_field]) if date_field else nepal_now().date().isoformat()
+        if store.business_date != business_date or total < store.size:
+            store.reset(business_date=business_date)
+
+        added = 0
+        batch = []
+        async for record in stream_records(store.size // FLOORSHEET_PAGE_SIZE, order="asc"):
+            batch.append(record)
+            if len(batch) >= FLOORSHEET_PAGE_SIZE:
+                added += store.add(batch)
+                batch = []
+        added += store.add(batch)
+        self.last_poll = time.time()
+        self.last_added = added
+        return added
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Floorsheet ingest error: {e}")
+            await asyncio.sleep(FLOORSHEET_POLL_INTERVAL if is_market_open() else FLOORSHEET_IDLE_INTERVAL)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self):
+        return {**self.store.status(), "last_poll": self.last_poll,
+                "last_added": self.last_added, "last_error": self.last_error}
@@ -0,0 +1,216 @@
+"""
+Push fan-out for the live feeds (index, sub-index, turnover).
+
+One LiveFeed per upstream feed polls it through the shared live cache while
+it has subscribers, so any number of connected dashboards cost one upstream
+call per interval. Each poll is turned into a map of items (one per index /
+sub-index, or per top-level field) and only the items that changed since the
+previous poll are pushed. A subscriber first gets the full snapshot.
+
+Every message is encoded once and the same bytes are queued to every
+subscriber. Queues are bounded: when a slow consumer's queue is full its
+pending diffs are dropped and replaced by a single fresh snapshot, so it
+catches up without holding memory or slowing the poller.
+"""
+import asyncio
+import json
+import time
+
+NAME_KEYS = ("indexName", "index", "sindex", "subIndexName", "name", "symbol", "id")
+QUEUE_SIZE = 32
+HEARTBEAT = 15
+
+
+def _as_dict(raw):
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, list):
+        return {str(i): value for i, value in enumerate(raw)}
+    return {"value": raw}
+
+
+def _records(data):
+    """First list of objects found in `data` (breadth first), or None."""
+    queue = [data]
+    while queue:
+        node = queue.pop(0)
+        if isinstance(node, list) and node and all(isinstance(x, dict) for x in node):
+            return node
+        if isinstance(node, dict):
+            queue.extend(node.values())
+    return None
+
+
+def feed_items(data):
+    """
+    Keys a feed payload by item: the records of its first list of objects by
+    their name field, otherwise its top-level fields.
+    """
+    records = _records(data)
+    if records:
+        key = next((k for k in NAME_KEYS if all(k in r for r in records)), None)
+        if key is not None:
+            return {str(r[key]): r for r in records}
+        return {str(i): r for i, r in enumerate(records)}
+    return _as_dict(data)
+
+
+def diff_items(old, new):
+    changed = {k: v for k, v in new.items() if old.get(k) != v}
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+class Message:
+    """One update, encoded once for every transport."""
+
+    def __init__(self, kind, body):
+        self.kind = kind
+        self.version = body["version"]
+        self.data = json.dumps(body, separators=(",", ":"), default=str)
+        self.sse = f"event: {kind}\nid: {body['version']}\ndata: {self.data}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, feed, size=QUEUE_SIZE):
+        self.feed = feed
+        self.queue = asyncio.Queue(maxsize=size)
+        self.resyncs = 0
+
+    def push(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: drop its backlog and let it resync from a snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.feed.snapshot_message())
+            self.resyncs += 1
+
+    async def get(self, timeout=HEARTBEAT):
+        """Next message, or None when nothing arrived within `timeout`."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LiveFeed:
+    def __init__(self, name, cache, key, fetch, interval):
+        self.name = name
+        self.cache = cache
+        self.key = key
+        self.fetch = fetch
+        self.interval = interval
+        self.items = {}
+        self.version = 0
+        self.updated_at = None
+        self.last_error = None
+        self.polls = 0
+        self.subscribers = set()
+        self._etag = None
+        self._snapshot = None
+        self._task = None
+
+    def _seconds(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+    def snapshot_message(self):
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            body = {"type": "snapshot", "feed": self.name, "version": self.version,
+                    "at": self.updated_at, "items": self.items}
+            self._snapshot = (self.version, Message("snapshot", body))
+        return self._snapshot[1]
+
+    async def poll(self):
+        # stale_ttl=0: an expired entry is fetched now rather than served stale
+        # while a background refresh runs, which would put every push one
+        # interval behind the upstream
+        result = await self.cache.get(self.key, self.fetch, ttl=self.interval, stale_ttl=0)
+        self.polls += 1
+        payload = result.value
+        if payload.etag == self._etag:
+            return None
+        self._etag = payload.etag
+        items = feed_items(json.loads(payload.body))
+        changed, removed = diff_items(self.items, items)
+        self.items = items
+        self.updated_at = time.time()
+        if self.version and not changed and not removed:
+            return None
+        self.version += 1
+        message = Message("diff", {"type": "diff", "feed": self.name, "version": self.version,
+                                   "at": self.updated_at, "changed": changed, "removed": removed})
+        for subscriber in list(self.subscribers):
+            subscriber.push(message)
+        return message
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                await self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Live feed {self.name} error: {e}")
+            await asyncio.sleep(self._seconds())
+        self._task = None
+
+    def subscribe(self):
+        subscriber = Subscriber(self)
+        self.subscribers.add(subscriber)
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def first_message(self):
+        """Full snapshot for a new subscriber, polling first if the feed has no data yet."""
+        if self.version == 0:
+            try:
+                await self.poll()
+            except Exception as e:
+                self.last_error = str(e)
+        return self.snapshot_message()
+
+    async def listen(self):
+        """
+        Messages for a new subscriber: the snapshot, then every newer diff (or
+        resync snapshot), with None as a heartbeat when the feed is quiet.
+        Subscribes on the first iteration and unsubscribes when the consumer
+        goes away, so a stream that is never started never subscribes.
+        """
+        subscriber = self.subscribe()
+        try:
+            first = await self.first_message()
+            yield first
+            seen = first.version
+            while True:
+                message = await subscriber.get()
+                if message is None:
+                    yield None
+                elif message.kind == "snapshot" or message.version > seen:
+                    seen = message.version
+                    yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self):
+        return {"feed": self.name, "subscribers": len(self.subscribers), "version": self.version,
+                "items": len(self.items), "polls": self.polls, "updated_at": self.updated_at,
+                "running": self._task is not None, "last_error": self.last_error,
+                "resyncs": sum(s.resyncs for s in self.subscribers)}
+
+
+async def sse_events(feed):
+    """SSE byte stream: the snapshot, then diffs, with comment heartbeats."""
+    async for message in feed.listen():
+        yield message.sse if message is not None else b": ping\n\n"
@@ -1,10 +1,11 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import httpx
+from fastapi.responses import Response, StreamingResponse
 import time
 import os
 import uvicorn
 import sys
+from contextlib import asynccontextmanager
 
 # Add shared directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,10 +14,40 @@ from shared.constants import (
     NEPSE_TURNOVER_URL, 
     NEPALIPAISA_INDEX_URL, 
     NEPALIPAISA_SUBINDEX_URL,
+    NEPSELYTICS_FLOORSHEET_URL,
     DEFAULT_HEADERS
 )
+from shared.upstream import UPSTREAM, upstream_client
+from shared.metrics import instrument
+from shared.payloads import Payload
+from shared.cache import UpstreamCache, cached_response
+from shared.market_hours import market_ttl
+from core_service.floorsheet import (
+    FLOORSHEET_PAGE_SIZE, FLOORSHEET_HEADERS, fetch_pages, stream_records, ndjson
+)
+from core_service.floorsheet_store import FloorsheetStore, FloorsheetIngester
+from core_service.live_stream import LiveFeed, sse_events
+from core_service.batch import Batcher, BatchError, DASHBOARD
+
+# Intraday floorsheet kept in memory by a background ingester
+# (disable with FLOORSHEET_INGEST=0)
+FLOORSHEET_STORE = FloorsheetStore()
+FLOORSHEET_INGESTER = FloorsheetIngester(FLOORSHEET_STORE)
 
-app = FastAPI(title="NEPSE Core Service")
+@asynccontextmanager
+async def lifespan(app):
+    async with upstream_client():
+        if os.environ.get("FLOORSHEET_INGEST", "1") != "0":
+            FLOORSHEET_INGESTER.start()
+        try:
+            yield
+        finally:
+            await FLOORSHEET_INGESTER.stop()
+            for feed in LIVE_FEEDS.values():
+                await feed.stop()
+            await BATCHER.close()
+
+app = FastAPI(title="NEPSE Core Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,46 +56,106 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument(app)
+
+# Live data is shared by all clients: a few seconds while the market is open,
+# minutes after the close. Expired entries are served for up to 30 more seconds
+# while one background fetch refreshes them.
+LIVE_TTL = {
+    "homepage-data": market_ttl(5, 300),
+    "market-turnover": market_ttl(3, 300),
+    "index-live": market_ttl(3, 300),
+    "subindex-live": market_ttl(5, 300),
+}
+LIVE_CACHE = UpstreamCache("core-live", ttl=market_ttl(5, 300), stale_ttl=30)
 
 @app.get("/")
 def root():
     return {"status": "Core Service Running", "service": "Core/Live"}
 
-@app.get("/homepage-data")
-async def homepage_data():
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(NEPSELYTICS_URL)
+async def _fetch_payload(url, detail, **kwargs):
+    resp = await UPSTREAM.get(url, **kwargs)
     if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail="Failed to fetch homepage market data")
-    return resp.json()
+        raise HTTPException(status_code=resp.status_code, detail=detail)
+    return Payload.from_bytes(resp.content)
+
+def _nepalipaisa_fetch(url, detail):
+    async def fetch():
+        headers = {**DEFAULT_HEADERS, "Referer": "https://nepalipaisa.com"}
+        params = {"_": int(time.time() * 1000)}
+        return await _fetch_payload(url, detail, headers=headers, params=params)
+    return fetch
+
+LIVE_FETCH = {
+    "homepage-data": lambda: _fetch_payload(NEPSELYTICS_URL, "Failed to fetch homepage market data"),
+    "market-turnover": lambda: _fetch_payload(NEPSE_TURNOVER_URL, "Failed to fetch NEPSE market turnover", headers=DEFAULT_HEADERS),
+    "index-live": _nepalipaisa_fetch(NEPALIPAISA_INDEX_URL, "Failed to fetch NEPSE index live data"),
+    "subindex-live": _nepalipaisa_fetch(NEPALIPAISA_SUBINDEX_URL, "Failed to fetch NEPSE sub-index live data"),
+}
+
+# Push feeds: one poller per feed (through LIVE_CACHE, so the plain endpoints
+# and the streams share upstream calls), running only while someone listens.
+LIVE_FEEDS = {
+    name: LiveFeed(name, LIVE_CACHE, key, LIVE_FETCH[key], LIVE_TTL[key])
+    for name, key in (("index", "index-live"), ("subindex", "subindex-live"), ("turnover", "market-turnover"))
+}
+
+async def _live(request, key):
+    return await cached_response(request, LIVE_CACHE, key, LIVE_FETCH[key], ttl=LIVE_TTL[key])
+
+@app.get("/homepage-data")
+async def homepage_data(request: Request):
+    return await _live(request, "homepage-data")
 
 @app.get("/market-turnover")
-async def market_turnover():
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(NEPSE_TURNOVER_URL, headers=DEFAULT_HEADERS)
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail="Failed to fetch NEPSE market turnover")
-    return resp.json()
+async def market_turnover(request: Request):
+    return await _live(request, "market-turnover")
 
 @app.get("/index-live")
-async def index_live():
-    headers = {**DEFAULT_HEADERS, "Referer": "https://nepalipaisa.com"}
-    params = {"_": int(time.time() * 1000)}
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(NEPALIPAISA_INDEX_URL, headers=headers, params=params)
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail="Failed to fetch NEPSE index live data")
-    return resp.json()
+async def index_live(request: Request):
+    return await _live(request, "index-live")
 
 @app.get("/subindex-live")
-async def subindex_live():
-    headers = {**DEFAULT_HEADERS, "Referer": "https://nepalipaisa.com"}
-    params = {"_": int(time.time() * 1000)}
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(NEPALIPAISA_SUBINDEX_URL, headers=headers, params=params)
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail="Failed to fetch NEPSE sub-index live data")
-    return resp.json()
+async def subindex_live(request: Request):
+    return await _live(request, "subindex-live")
+
+@app.get("/stream/status")
+def stream_status():
+    return {"feeds": [feed.status() for feed in LIVE_FEEDS.values()]}
+
+@app.get("/stream/{feed}")
+async def stream_feed(feed: str):
+    """
+    Server-Sent Events for index, subindex or turnover: a "snapshot" event with
+    every item, then "diff" events with the changed and removed items only.
+    Each event id is the feed version. A client that falls behind gets a fresh
+    snapshot instead of its backlog.
+    """
+    live = LIVE_FEEDS.get(feed)
+    if live is None:
+        raise HTTPException(status_code=404, detail=f"Unknown feed: {feed}. Use one of: {', '.join(LIVE_FEEDS)}")
+    return StreamingResponse(
+        sse_events(live),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/{feed}")
+async def websocket_feed(websocket: WebSocket, feed: str):
+    """Same messages as /stream/{feed} (JSON text frames) over a WebSocket."""
+    live = LIVE_FEEDS.get(feed)
+    if live is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    messages = live.listen()
+    try:
+        async for message in messages:
+            await websocket.send_text(message.data if message is not None else '{"type":"ping"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await messages.aclose()
 
 @app.get("/floorsheet")
 async def floorsheet(
@@ -72,38 +163,92 @@ async def floorsheet(
     size: int = Query(500, ge=1, le=500),
     order: str = Query("desc", regex="^(asc|desc)$")
 ):
-    from shared.constants import NEPSELYTICS_FLOORSHEET_URL
-    headers = {**DEFAULT_HEADERS, "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-    
-    if size > 100:
-        all_records = []
-        pages_needed = (size + 99) // 100
-        async with httpx.AsyncClient(timeout=30) as client:
-            for i in range(pages_needed):
-                params = {"page": page + i, "Size": 100, "order": order}
-                resp = await client.get(NEPSELYTICS_FLOORSHEET_URL, params=params, headers=headers)
-                if resp.status_code != 200: break
-                records = resp.json().get("data", {}).get("content", [])
-                all_records.extend(records)
-                if len(records) < 100: break
+    if size > FLOORSHEET_PAGE_SIZE:
+        pages_needed = (size + FLOORSHEET_PAGE_SIZE - 1) // FLOORSHEET_PAGE_SIZE
+        all_records = await fetch_pages(page, pages_needed, order)
         return {"success": True, "data": all_records[:size]}
     else:
         params = {"page": page, "Size": size, "order": order}
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(NEPSELYTICS_FLOORSHEET_URL, params=params, headers=headers)
+        resp = await UPSTREAM.get(NEPSELYTICS_FLOORSHEET_URL, params=params, headers=FLOORSHEET_HEADERS)
         return resp.json()
 
+@app.get("/floorsheet/stream")
+async def floorsheet_stream(
+    page: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1),
+    order: str = Query("desc", regex="^(asc|desc)$")
+):
+    """
+    Streams the day's floorsheet as NDJSON (one trade per line), starting at
+    upstream page `page` (100 trades per page), until the last page or `limit` trades.
+    Example: /floorsheet/stream?order=asc
+    """
+    records = stream_records(page, order, limit)
+    return StreamingResponse(ndjson(records), media_type="application/x-ndjson")
+
 @app.get("/floorsheet/totals")
 async def floorsheet_totals():
-    from shared.constants import NEPSELYTICS_FLOORSHEET_URL
     headers = DEFAULT_HEADERS
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(NEPSELYTICS_FLOORSHEET_URL, params={"page": 0, "Size": 1, "order": "desc"}, headers=headers)
+    resp = await UPSTREAM.get(NEPSELYTICS_FLOORSHEET_URL, params={"page": 0, "Size": 1, "order": "desc"}, headers=headers)
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail="Failed to fetch floorsheet totals")
     data = resp.json().get("data", {})
     return {"success": True, "data": {"totalAmount": data.get("totalAmount", 0), "totalQty": data.get("totalQty", 0), "totalTrades": data.get("totalTrades", 0)}}
 
+@app.get("/floorsheet/store/status")
+def floorsheet_store_status():
+    return {"success": True, "data": FLOORSHEET_INGESTER.status()}
+
+@app.get("/floorsheet/symbols")
+def floorsheet_symbols(limit: int = Query(None, ge=1)):
+    """Per-symbol trades, quantity, amount and VWAP for the day, by amount."""
+    return {"success": True, "data": FLOORSHEET_STORE.symbol_summary()[:limit]}
+
+@app.get("/floorsheet/symbols/{symbol}")
+def floorsheet_symbol(symbol: str, top: int = Query(5, ge=1, le=50)):
+    """Day totals for one symbol with its top buying and selling brokers."""
+    detail = FLOORSHEET_STORE.symbol_detail(symbol, top)
+    if detail is None:
+        raise HTTPException(status_code=404, detail=f"No trades for {symbol} today")
+    return {"success": True, "data": detail}
+
+@app.get("/floorsheet/brokers")
+def floorsheet_brokers(limit: int = Query(None, ge=1)):
+    """Per-broker buy/sell quantity and amount for the day, by turnover."""
+    return {"success": True, "data": FLOORSHEET_STORE.broker_summary()[:limit]}
+
+# Batched reads: core resources are served in-process, the other services
+# over pooled connections (MARKET_INFO_SERVICE_URL, TECHNICAL_SERVICE_URL,
+# CHARTS_SERVICE_URL)
+BATCHER = Batcher(app)
+
+async def _batch(items):
+    try:
+        body = await BATCHER.run(items)
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(body, media_type="application/json")
+
+@app.post("/batch")
+async def batch(request: Request):
+    """
+    Resolves several resources in one round trip, each with its own status
+    and timeout. Body: {"items": [{"resource": "index-live"},
+    {"resource": "announcements", "params": {"size": 5}, "timeout": 3},
+    {"resource": "stock-chart", "id": "nabil", "params": {"symbol": "NABIL", "max_points": 100}}]}
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    return await _batch(items)
+
+@app.get("/dashboard")
+async def dashboard():
+    """The home screen resources (live market, floorsheet totals, announcements, IPOs, volume shockers) in one call."""
+    return await _batch(DASHBOARD)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8001))
     uvicorn.run("main:app", host="0.0.0.0", port=port)
@@ -1,9 +1,13 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import httpx
+import asyncio
+import json
 import os
+import threading
+import time
 import uvicorn
 import sys
+from contextlib import asynccontextmanager
 
 # Add shared directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,8 +16,50 @@ from shared.constants import (
     SHAREHUB_OFFERING_URL,
     DEFAULT_HEADERS
 )
+from shared.upstream import UPSTREAM, upstream_client
+from shared.metrics import instrument
+from shared.payloads import Payload, serve_payload
+from shared.cache import UpstreamCache, cached_response
+from shared.market_hours import market_ttl
 
-app = FastAPI(title="NEPSE Market Info Service")
+# Announcements and offerings change a few times a day at most
+ANNOUNCEMENT_CACHE = UpstreamCache("announcements", ttl=market_ttl(120, 900), stale_ttl=300)
+OFFERING_CACHE = UpstreamCache("offerings", ttl=600, stale_ttl=600)
+
+# Every offering category is prefetched with PREFETCH_SIZE items, together
+# with the first ANNOUNCEMENT_PAGES pages of announcements, more often than
+# the TTLs, so requests are answered from memory and upstream load does not
+# grow with traffic. Offering sizes are capped at PREFETCH_SIZE; other
+# announcement pages are fetched on demand.
+OFFERING_CATEGORIES = {
+    "ipo-general": (0, 2),
+    "ipo-local": (0, 0),
+    "ipo-foreign": (0, 1),
+    "right-share": (2, 2),
+    "fpo": (1, 2),
+    "mutual-fund-offering": (3, 2),
+    "debenture-offering": (4, 2),
+}
+PREFETCH_SIZE = int(os.environ.get("OFFERING_PREFETCH_SIZE", 100))
+ANNOUNCEMENT_PAGES = int(os.environ.get("ANNOUNCEMENT_PREFETCH_PAGES", 3))
+ANNOUNCEMENT_PAGE_SIZE = 12
+PREFETCH_INTERVAL = market_ttl(90, 480)
+PREFETCH = {"last_run": None, "duration": None, "errors": {}}
+
+@asynccontextmanager
+async def lifespan(app):
+    async with upstream_client():
+        task = None
+        if os.environ.get("MARKET_INFO_PREFETCH", "1") != "0":
+            task = asyncio.create_task(auto_prefetch())
+        try:
+            yield
+        finally:
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+app = FastAPI(title="NEPSE Market Info Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,44 +68,150 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument(app)
+
+def _items(data):
+    """The list of offerings in an upstream payload (first list found, breadth first)."""
+    queue = [data]
+    while queue:
+        node = queue.pop(0)
+        if isinstance(node, list):
+            return node
+        if isinstance(node, dict):
+            queue.extend(node.values())
+    return None
+
+def _sliced(data, items, size):
+    """`data` with the list `items` cut to `size` entries."""
+    if data is items:
+        return items[:size]
+    if isinstance(data, dict):
+        return {k: _sliced(v, items, size) for k, v in data.items()}
+    return data
 
-async def fetch_offerings(type: int, for_category: int, size: int = 30):
-    params = {"size": 30, "type": type, "for": for_category}
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(SHAREHUB_OFFERING_URL, params=params, headers=DEFAULT_HEADERS)
+class OfferingList:
+    """One category's upstream payload, with encoded slices per requested size."""
+
+    def __init__(self, body, size):
+        self.size = size
+        self.data = json.loads(body)
+        self.payload = Payload.from_bytes(body)
+        self.count = len(_items(self.data) or [])
+        self._slices = {}
+        self._lock = threading.Lock()
+
+    def sliced(self, size):
+        """Payload with at most `size` offerings."""
+        if size >= self.count:
+            return self.payload
+        with self._lock:
+            payload = self._slices.get(size)
+        if payload is None:
+            body = json.dumps(_sliced(self.data, _items(self.data), size), separators=(",", ":")).encode()
+            payload = Payload.from_bytes(body)
+            with self._lock:
+                self._slices[size] = payload
+        return payload
+
+async def fetch_offerings(type: int, for_category: int, size: int = PREFETCH_SIZE):
+    params = {"size": size, "type": type, "for": for_category}
+    resp = await UPSTREAM.get(SHAREHUB_OFFERING_URL, params=params, headers=DEFAULT_HEADERS)
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail="Failed to fetch offerings")
-    return resp.json()
+    return OfferingList(resp.content, size)
 
-@app.get("/announcements")
-async def announcements(page: int = 1, size: int = 12):
+async def _offering_list(type, for_category):
+    """(OfferingList, CacheResult) of the prefetched list of one category."""
+    key = (type, for_category)
+    result = await OFFERING_CACHE.get(key, lambda: fetch_offerings(type, for_category))
+    return result.value, result
+
+async def offerings(request: Request, type: int, for_category: int, size: int = 30):
+    offering_list, result = await _offering_list(type, for_category)
+    return serve_payload(request, offering_list.sliced(size), headers=result.headers())
+
+async def fetch_announcements(page, size):
     params = {"Page": page, "Size": size}
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(SHAREHUB_ANNOUNCEMENT_URL, params=params, headers=DEFAULT_HEADERS)
+    resp = await UPSTREAM.get(SHAREHUB_ANNOUNCEMENT_URL, params=params, headers=DEFAULT_HEADERS)
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail="Failed to fetch announcements")
-    return resp.json()
+    return Payload.from_bytes(resp.content)
+
+async def prefetch():
+    """Refreshes every offering category and the first announcement pages concurrently."""
+    started = time.perf_counter()
+    jobs = {name: (OFFERING_CACHE, key, lambda key=key: fetch_offerings(*key))
+            for name, key in OFFERING_CATEGORIES.items()}
+    for page in range(1, ANNOUNCEMENT_PAGES + 1):
+        key = (page, ANNOUNCEMENT_PAGE_SIZE)
+        jobs[f"announcements-{page}"] = (ANNOUNCEMENT_CACHE, key, lambda key=key: fetch_announcements(*key))
+    results = await asyncio.gather(*(fetch() for _, _, fetch in jobs.values()), return_exceptions=True)
+    errors = {}
+    for (name, (cache, key, _)), value in zip(jobs.items(), results):
+        if isinstance(value, Exception):
+            errors[name] = getattr(value, "detail", None) or str(value)
+        else:
+            cache.set(key, value)
+    PREFETCH.update(last_run=time.time(), errors=errors, duration=round(time.perf_counter() - started, 3))
+    if errors:
+        print(f"⚠️ Prefetch failed for {', '.join(errors)}")
+    return errors
+
+async def auto_prefetch():
+    while True:
+        try:
+            await prefetch()
+        except Exception as e:
+            print(f"❌ Prefetch error: {e}")
+        await asyncio.sleep(PREFETCH_INTERVAL())
+
+@app.get("/announcements")
+async def announcements(
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: int = Query(ANNOUNCEMENT_PAGE_SIZE, ge=1)
+):
+    fetch = lambda: fetch_announcements(page, size)
+    return await cached_response(request, ANNOUNCEMENT_CACHE, (page, size), fetch)
+
+@app.get("/offerings/all")
+async def offerings_all(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)):
+    """Every offering category at once: {"success": true, "data": {"ipo-general": <payload>, ...}}."""
+    lists = await asyncio.gather(*(_offering_list(*key) for key in OFFERING_CATEGORIES.values()),
+                                 return_exceptions=True)
+    parts = []
+    for name, value in zip(OFFERING_CATEGORIES, lists):
+        body = b"null" if isinstance(value, Exception) else value[0].sliced(size).body
+        parts.append(json.dumps(name).encode() + b":" + body)
+    failed = [name for name, value in zip(OFFERING_CATEGORIES, lists) if isinstance(value, Exception)]
+    body = b'{"success":' + (b"false" if failed else b"true") + b',"failed":' + json.dumps(failed).encode() \
+        + b',"data":{' + b",".join(parts) + b"}}"
+    return serve_payload(request, Payload.from_bytes(body))
+
+@app.get("/offerings/status")
+def offerings_status():
+    return {"prefetch": PREFETCH, "prefetch_size": PREFETCH_SIZE, "announcement_pages": ANNOUNCEMENT_PAGES}
 
 @app.get("/ipo/general")
-async def ipo_general(size: int = 30): return await fetch_offerings(0, 2, size)
+async def ipo_general(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 0, 2, size)
 
 @app.get("/ipo/local")
-async def ipo_local(size: int = 30): return await fetch_offerings(0, 0, size)
+async def ipo_local(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 0, 0, size)
 
 @app.get("/ipo/foreign")
-async def ipo_foreign(size: int = 30): return await fetch_offerings(0, 1, size)
+async def ipo_foreign(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 0, 1, size)
 
 @app.get("/right-share")
-async def right_share(size: int = 30): return await fetch_offerings(2, 2, size)
+async def right_share(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 2, 2, size)
 
 @app.get("/fpo")
-async def fpo(size: int = 30): return await fetch_offerings(1, 2, size)
+async def fpo(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 1, 2, size)
 
 @app.get("/mutual-fund-offering")
-async def mutual_fund_offering(size: int = 30): return await fetch_offerings(3, 2, size)
+async def mutual_fund_offering(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 3, 2, size)
 
 @app.get("/debenture-offering")
-async def debenture_offering(size: int = 30): return await fetch_offerings(4, 2, size)
+async def debenture_offering(request: Request, size: int = Query(30, ge=1, le=PREFETCH_SIZE)): return await offerings(request, 4, 2, size)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8004))
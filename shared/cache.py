@@ -0,0 +1,129 @@
+"""
+TTL cache for upstream responses.
+
+- fresh:  younger than the TTL, served directly
+- stale:  past the TTL but within the stale window; served immediately while
+          one background task refreshes it
+- miss:   fetched, with concurrent misses for the same key sharing a single
+          in-flight fetch (single-flight)
+- error:  the fetch failed but an earlier value exists; the last good value is
+          served and its age reported
+
+TTLs may be numbers or zero-argument callables (see market_hours.market_ttl).
+At most `max_entries` keys are kept; the least recently used one is dropped
+first, so keys built from client input cannot grow the cache without bound.
+Every lookup is counted by cache and state in nepsehub_cache_requests_total
+("failed" when the fetch raised and there was nothing to fall back on).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from shared.payloads import serve_payload
+from shared.metrics import CACHE_REQUESTS
+
+
+@dataclass(frozen=True)
+class CacheResult:
+    value: object
+    age: float
+    state: str
+
+    def headers(self):
+        return {"Age": str(int(self.age)), "X-Cache": self.state}
+
+
+@dataclass(frozen=True)
+class _Entry:
+    value: object
+    fetched_at: float
+
+
+def _seconds(ttl):
+    return ttl() if callable(ttl) else ttl
+
+
+class UpstreamCache:
+    def __init__(self, name, ttl, stale_ttl=30, max_entries=256):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def peek(self, key):
+        """Last stored value for `key` (any age) or None."""
+        entry = self._entries.get(key)
+        return entry.value if entry else None
+
+    def set(self, key, value):
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _fetch(self, key, fetch):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, fetch))
+            self._inflight[key] = task
+        return task
+
+    async def _run(self, key, fetch):
+        try:
+            value = await fetch()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key, fetch):
+        task = self._fetch(key, fetch)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def get(self, key, fetch, ttl=None, stale_ttl=None):
+        """
+        Returns a CacheResult for `key`, calling the coroutine function `fetch`
+        when the entry is missing or expired.
+        """
+        try:
+            result = await self._lookup(key, fetch, ttl, stale_ttl)
+        except Exception:
+            CACHE_REQUESTS.inc(cache=self.name, state="failed")
+            raise
+        CACHE_REQUESTS.inc(cache=self.name, state=result.state)
+        return result
+
+    async def _lookup(self, key, fetch, ttl, stale_ttl):
+        ttl = _seconds(self.ttl if ttl is None else ttl)
+        stale_ttl = _seconds(self.stale_ttl if stale_ttl is None else stale_ttl)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = now - entry.fetched_at
+            if age < ttl:
+                return CacheResult(entry.value, age, "hit")
+            if age < ttl + stale_ttl:
+                self._refresh_in_background(key, fetch)
+                return CacheResult(entry.value, age, "stale")
+
+        try:
+            value = await asyncio.shield(self._fetch(key, fetch))
+        except Exception:
+            if entry is None:
+                raise
+            return CacheResult(entry.value, time.monotonic() - entry.fetched_at, "error")
+        return CacheResult(value, 0.0, "miss")
+
+
+async def cached_response(request, cache, key, fetch, ttl=None):
+    """Serves the Payload cached under `key`, with Age and X-Cache headers."""
+    result = await cache.get(key, fetch, ttl=ttl)
+    return serve_payload(request, result.value, headers=result.headers())
@@ -0,0 +1,79 @@
+"""
+NEPSE trading hours.
+
+NEPSE trades Sunday to Thursday, 11:00-15:00 Nepal time (UTC+05:45), except
+on exchange holidays. Holidays are read from the NEPSE_HOLIDAYS env variable
+as ISO dates separated by commas or whitespace, e.g.
+NEPSE_HOLIDAYS="2026-10-20,2026-10-21".
+
+A day goes through three phases: "open" during the session, "post_close"
+for POST_CLOSE_WINDOW after the close (end-of-day data lands then) and
+"closed" otherwise.
+"""
+import os
+import re
+from datetime import date, datetime, time, timedelta, timezone
+
+NEPAL_TZ = timezone(timedelta(hours=5, minutes=45))
+MARKET_OPEN = time(11, 0)
+MARKET_CLOSE = time(15, 0)
+TRADING_WEEKDAYS = {6, 0, 1, 2, 3}  # datetime.weekday(): Sunday=6 ... Thursday=3
+POST_CLOSE_WINDOW = timedelta(hours=3)
+
+
+def _holidays(value):
+    return {date.fromisoformat(day) for day in re.split(r"[\s,]+", value.strip()) if day}
+
+
+HOLIDAYS = _holidays(os.environ.get("NEPSE_HOLIDAYS", ""))
+
+
+def nepal_now():
+    return datetime.now(NEPAL_TZ)
+
+
+def is_trading_day(now=None):
+    now = now or nepal_now()
+    return now.weekday() in TRADING_WEEKDAYS and now.date() not in HOLIDAYS
+
+
+def is_market_open(now=None):
+    now = now or nepal_now()
+    return is_trading_day(now) and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def _at(day, at):
+    return datetime.combine(day, at, tzinfo=NEPAL_TZ)
+
+
+def market_phase(now=None):
+    """"open", "post_close" or "closed"."""
+    now = now or nepal_now()
+    if not is_trading_day(now):
+        return "closed"
+    close = _at(now.date(), MARKET_CLOSE)
+    if _at(now.date(), MARKET_OPEN) <= now < close:
+        return "open"
+    if close <= now < close + POST_CLOSE_WINDOW:
+        return "post_close"
+    return "closed"
+
+
+def next_phase_change(now=None):
+    """Time at which market_phase() next changes."""
+    now = now or nepal_now()
+    day = now.date()
+    if is_trading_day(now):
+        for boundary in (_at(day, MARKET_OPEN), _at(day, MARKET_CLOSE), _at(day, MARKET_CLOSE) + POST_CLOSE_WINDOW):
+            if now < boundary:
+                return boundary
+    for _ in range(30):
+        day += timedelta(days=1)
+        if is_trading_day(_at(day, MARKET_OPEN)):
+            return _at(day, MARKET_OPEN)
+    return now + timedelta(days=1)
+
+
+def market_ttl(open_ttl, closed_ttl):
+    """TTL callable: `open_ttl` seconds while the market is open, `closed_ttl` otherwise."""
+    return lambda: open_ttl if is_market_open() else closed_ttl
@@ -0,0 +1,409 @@
+"""
+Prometheus metrics and an on-demand sampling profiler, without extra
+dependencies.
+
+Every service calls `instrument(app)`, which mounts GET /metrics (Prometheus
+text format 0.0.4) and an ASGI middleware that records request durations
+per route, the number of requests in flight and the event-loop lag (a
+ticker that measures how late its sleeps wake up). Shared modules record
+their own series: upstream latency, status and errors per target in
+shared.upstream, cache hit/miss/stale/error counts in shared.cache.
+
+Metrics are per process; with several uvicorn workers each worker is its
+own scrape target (or is sampled at random behind one port).
+
+With METRICS_PROFILER=1, GET /debug/profile samples the Python stacks of
+every thread for a few seconds and returns the hottest functions and the
+folded stacks (flamegraph.pl / speedscope input). It is off by default: a
+sampler walks every thread's frames a few hundred times per second.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+LOOP_LAG_INTERVAL = float(os.environ.get("METRICS_LOOP_LAG_INTERVAL", 0.5))
+PROFILER_ENABLED = os.environ.get("METRICS_PROFILER", "0") == "1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), function=None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """Reads the (unlabelled) value from `function()` at scrape time."""
+        self.function = function
+
+    def _samples(self):
+        if self.function is None:
+            return super()._samples()
+        try:
+            value = self.function()
+        except Exception:
+            return []
+        return [] if value is None else [(self.name, (), (), value)]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        samples = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                samples.append((f"{self.name}_bucket", key, (("le", _number(float(bound))),), count))
+            samples.append((f"{self.name}_bucket", key, (("le", "+Inf"),), state[-2]))
+            samples.append((f"{self.name}_count", key, (), state[-2]))
+            samples.append((f"{self.name}_sum", key, (), state[-1]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def gauge(name, help, labels=(), function=None):
+    return REGISTRY.register(Gauge(name, help, labels, function))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+PROCESS_START = gauge("nepsehub_process_start_time_seconds", "Unix time the process started")
+PROCESS_START.set(time.time())
+HTTP_IN_FLIGHT = gauge("nepsehub_http_requests_in_flight", "HTTP requests (and open streams) being served")
+HTTP_DURATION = histogram("nepsehub_http_request_duration_seconds", "Time to serve an HTTP request",
+                          ("method", "route", "status"))
+LOOP_LAG = gauge("nepsehub_event_loop_lag_seconds", "How late the last event-loop tick woke up")
+LOOP_LAG_SECONDS = histogram("nepsehub_event_loop_lag_observed_seconds", "Event-loop tick lateness",
+                             buckets=LAG_BUCKETS)
+UPSTREAM_DURATION = histogram("nepsehub_upstream_request_duration_seconds", "Upstream request latency",
+                              ("target", "method"))
+UPSTREAM_REQUESTS = counter("nepsehub_upstream_requests_total", "Upstream responses by status",
+                            ("target", "status"))
+UPSTREAM_ERRORS = counter("nepsehub_upstream_errors_total", "Failed upstream calls (exceptions and HTTP errors)",
+                          ("target", "error"))
+UPSTREAM_IN_FLIGHT = gauge("nepsehub_upstream_in_flight", "Upstream requests in progress", ("host",))
+CACHE_REQUESTS = counter("nepsehub_cache_requests_total", "Cache lookups by result (hit, stale, miss, error, failed)",
+                         ("cache", "state"))
+
+
+# Upstream routes whose next segment is a symbol or index name in any case
+# (e.g. daily-graph/index/Banking); always collapsed so labels stay bounded
+SYMBOL_ROUTES = ("/price-history/graph/", "/daily-graph/index/")
+
+
+def _placeholder(segment):
+    return segment.isdigit() or (segment.isupper() and len(segment) <= 12)
+
+
+def upstream_target(url):
+    """host/path of an upstream URL with symbol and id segments collapsed, e.g. sharehubnepal.com/.../graph/{id}."""
+    parts = urlsplit(str(url))
+    segments = parts.path.split("/")
+    for route in SYMBOL_ROUTES:
+        head, found, tail = parts.path.partition(route)
+        if found and tail:
+            position = head.count("/") + route.count("/")
+            segments[position] = "{id}"
+    path = "/".join("{id}" if _placeholder(s) else s for s in segments)
+    return f"{parts.hostname}{path}"
+
+
+@contextmanager
+def track_upstream(method, url):
+    """Records one upstream call; set `.status` on the yielded object once the response arrives."""
+    target = upstream_target(url)
+    host = urlsplit(str(url)).hostname
+    call = type("UpstreamCall", (), {"status": None})()
+    UPSTREAM_IN_FLIGHT.inc(host=host)
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(target=target, error=type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(host=host)
+        UPSTREAM_DURATION.observe(time.perf_counter() - started, target=target, method=method)
+        if call.status is not None:
+            UPSTREAM_REQUESTS.inc(target=target, status=call.status)
+            if call.status >= 400:
+                UPSTREAM_ERRORS.inc(target=target, error=f"http_{call.status}")
+
+
+async def monitor_event_loop(interval=LOOP_LAG_INTERVAL):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        LOOP_LAG.set(lag)
+        LOOP_LAG_SECONDS.observe(lag)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request duration per route, in-flight requests, event-loop lag ticker."""
+
+    def __init__(self, app):
+        self.app = app
+        self._monitor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.app(scope, self._lifespan_receive(receive), send)
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_DURATION.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status)
+
+    def _lifespan_receive(self, receive):
+        async def wrapped():
+            message = await receive()
+            if message["type"] == "lifespan.startup" and self._monitor is None:
+                self._monitor = asyncio.create_task(monitor_event_loop())
+            elif message["type"] == "lifespan.shutdown" and self._monitor is not None:
+                self._monitor.cancel()
+                self._monitor = None
+            return message
+        return wrapped
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of some threads (all but its own by default)
+    every `interval` seconds from a background thread. Frames are aggregated
+    per function, so the folded output stays small.
+    """
+
+    def __init__(self, interval=0.005, threads=None):
+        self.interval = interval
+        self.threads = set(threads) if threads else None
+        self.stacks = _Tally()
+        self.samples = 0
+        self.started = self.stopped = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-profiler", daemon=True)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.threads is not None and ident not in self.threads):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        """Folded stacks, one "frame;frame;frame count" line each."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def report(self, limit=30):
+        own, total = _Tally(), _Tally()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        share = lambda n: round(100 * n / self.samples, 1) if self.samples else 0.0
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "duration": round((self.stopped or time.perf_counter()) - self.started, 3),
+            "self": [{"function": f, "samples": n, "percent": share(n)} for f, n in own.most_common(limit)],
+            "total": [{"function": f, "samples": n, "percent": share(n)} for f, n in total.most_common(limit)],
+        }
+
+
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def profiling(interval, threads=None):
+    """One profile at a time; raises 404 when the profiler is disabled and 409 while another runs."""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set METRICS_PROFILER=1)")
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        with SamplingProfiler(interval, threads) as profiler:
+            yield profiler
+    finally:
+        _profile_lock.release()
+
+
+def profile_response(profiler, format, **extra):
+    if format == "collapsed":
+        return Response(profiler.collapsed(), media_type="text/plain")
+    return JSONResponse({**extra, **profiler.report()})
+
+
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+async def profile(
+    seconds: float = Query(5, gt=0, le=60),
+    interval: float = Query(0.005, ge=0.001, le=1),
+    format: str = Query("json", regex="^(json|collapsed)$"),
+):
+    """Samples every thread for `seconds`; format=collapsed returns folded stacks for flamegraphs."""
+    with profiling(interval) as profiler:
+        await asyncio.sleep(seconds)
+    return profile_response(profiler, format)
+
+
+def instrument(app):
+    """Mounts /metrics (and /debug/profile when enabled) and the metrics middleware on `app`."""
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    app.add_api_route("/debug/profile", profile, methods=["GET"])
+    return app
@@ -0,0 +1,58 @@
+"""
+Pre-encoded JSON responses.
+
+A Payload holds the encoded body of a response that is served many times
+between data changes, together with a gzip copy and a strong ETag, so a
+request costs a header comparison instead of a JSON encode.
+"""
+import gzip
+import hashlib
+from dataclasses import dataclass
+
+from fastapi import Request
+from fastapi.responses import Response
+
+GZIP_MIN_SIZE = 1024
+JSON_MEDIA_TYPE = "application/json"
+
+
+@dataclass(frozen=True)
+class Payload:
+    body: bytes
+    etag: str
+    gzip_body: bytes = None
+
+    @classmethod
+    def from_bytes(cls, body, compress=True):
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        gzip_body = None
+        if compress and len(body) >= GZIP_MIN_SIZE:
+            gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+        return cls(body=body, etag=f'"{digest}"', gzip_body=gzip_body)
+
+
+def _etag_matches(header, etags):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return not candidates.isdisjoint(etags)
+
+
+def serve_payload(request: Request, payload: Payload, headers=None):
+    """Serves a Payload, answering 304 to a matching If-None-Match."""
+    gz_etag = payload.etag[:-1] + '-gz"'
+    use_gzip = payload.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", "")
+    response_headers = {
+        "ETag": gz_etag if use_gzip else payload.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+        **(headers or {}),
+    }
+    if _etag_matches(request.headers.get("if-none-match"), (payload.etag, gz_etag)):
+        return Response(status_code=304, headers=response_headers)
+    if use_gzip:
+        response_headers["Content-Encoding"] = "gzip"
+        return Response(payload.gzip_body, media_type=JSON_MEDIA_TYPE, headers=response_headers)
+    return Response(payload.body, media_type=JSON_MEDIA_TYPE, headers=response_headers)
@@ -0,0 +1,167 @@
+"""
+Process-wide pooled HTTP client for upstream APIs.
+
+One httpx.AsyncClient per upstream host keeps its own connection pool with
+keep-alive, so repeated calls reuse TCP/TLS connections instead of paying a
+handshake per request. Each host has its own timeout and concurrency limit
+(see UPSTREAM_LIMITS, overridable through the UPSTREAM_LIMITS env variable as
+JSON, e.g. '{"nepalipaisa.com": {"timeout": 5}}'). HTTP/2 is negotiated when
+the optional `h2` package is installed.
+
+Services open and close the shared client in their lifespan:
+
+    app = FastAPI(lifespan=upstream_lifespan)
+
+and call `await UPSTREAM.get(url, params=..., headers=...)`. Tests and
+benchmarks swap the network for a stub with `UPSTREAM.set_transport(...)`.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from urllib.parse import urlsplit
+
+import httpx
+
+from shared.constants import (
+    NEPSELYTICS_URL, NEPSE_TURNOVER_URL, NEPSELYTICS_FLOORSHEET_URL,
+    NEPALIPAISA_INDEX_URL, GOOGLE_SHEET_CSV,
+)
+from shared.metrics import track_upstream
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class UpstreamLimits:
+    timeout: float = 20
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 60
+    max_concurrency: int = 20
+
+
+def _host(url):
+    return urlsplit(url).hostname
+
+
+UPSTREAM_LIMITS = {
+    _host(NEPSELYTICS_URL): UpstreamLimits(),
+    _host(NEPSE_TURNOVER_URL): UpstreamLimits(max_concurrency=10),
+    _host(NEPSELYTICS_FLOORSHEET_URL): UpstreamLimits(timeout=30, max_concurrency=8),
+    _host(NEPALIPAISA_INDEX_URL): UpstreamLimits(max_concurrency=10),
+    _host(GOOGLE_SHEET_CSV): UpstreamLimits(timeout=60, max_connections=2, max_concurrency=2),
+}
+DEFAULT_LIMITS = UpstreamLimits()
+
+
+def _env_limits():
+    overrides = json.loads(os.environ.get("UPSTREAM_LIMITS", "{}") or "{}")
+    return {host: replace(UPSTREAM_LIMITS.get(host, DEFAULT_LIMITS), **values) for host, values in overrides.items()}
+
+
+class UpstreamClient:
+    def __init__(self, limits=None, transport=None, http2=None):
+        self.limits = {**UPSTREAM_LIMITS, **(limits or {})}
+        self.transport = transport
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+        self._clients = {}
+        self._semaphores = {}
+
+    def configure(self, host, **values):
+        """Overrides the limits of one host; takes effect for new clients."""
+        self.limits[host] = replace(self.limits.get(host, DEFAULT_LIMITS), **values)
+
+    def set_transport(self, transport):
+        """Routes every upstream call through `transport` (e.g. httpx.MockTransport)."""
+        self.transport = transport
+        self._clients = {}
+
+    def limits_for(self, host):
+        return self.limits.get(host, DEFAULT_LIMITS)
+
+    def _client(self, host):
+        client = self._clients.get(host)
+        if client is None:
+            limits = self.limits_for(host)
+            client = httpx.AsyncClient(
+                timeout=limits.timeout,
+                limits=httpx.Limits(
+                    max_connections=limits.max_connections,
+                    max_keepalive_connections=limits.max_keepalive,
+                    keepalive_expiry=limits.keepalive_expiry,
+                ),
+                http2=self.http2 and self.transport is None,
+                transport=self.transport,
+            )
+            self._clients[host] = client
+        return client
+
+    def _semaphore(self, host):
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.limits_for(host).max_concurrency)
+        return semaphore
+
+    async def request(self, method, url, **kwargs):
+        host = _host(url)
+        async with self._semaphore(host):
+            with track_upstream(method, url) as call:
+                resp = await self._client(host).request(method, url, **kwargs)
+                call.status = resp.status_code
+                return resp
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method, url, **kwargs):
+        """Streams a response body; the concurrency slot is held until the block exits."""
+        host = _host(url)
+        async with self._semaphore(host):
+            with track_upstream(method, url) as call:
+                async with self._client(host).stream(method, url, **kwargs) as resp:
+                    call.status = resp.status_code
+                    yield resp
+
+    async def download(self, url, file, hasher=None, chunk_size=1 << 16, **kwargs):
+        """
+        GETs `url` and writes a 200 body into the binary `file` chunk by chunk,
+        so it is never held in memory whole; `hasher` (a hashlib object) is
+        fed the same chunks. Returns the (closed) response.
+        """
+        async with self.stream("GET", url, **kwargs) as resp:
+            if resp.status_code == 200:
+                async for chunk in resp.aiter_bytes(chunk_size):
+                    file.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+            return resp
+
+    async def start(self):
+        self.limits.update(_env_limits())
+        self._semaphores = {}
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        await asyncio.gather(*(client.aclose() for client in clients.values()), return_exceptions=True)
+
+
+UPSTREAM = UpstreamClient()
+
+
+@asynccontextmanager
+async def upstream_client():
+    await UPSTREAM.start()
+    try:
+        yield UPSTREAM
+    finally:
+        await UPSTREAM.close()
+
+
+@asynccontextmanager
+async def upstream_lifespan(app):
+    async with upstream_client():
+        yield
@@ -0,0 +1,102 @@
+"""
+Leader / follower coordination for multi-worker deployments.
+
+With TECHNICAL_SNAPSHOT_MODE=shared (e.g. `uvicorn main:app --workers 4`)
+the workers share one snapshot directory (see persist.py). The worker
+holding an exclusive flock on <dir>/leader.lock is the leader: it alone
+downloads the sheet, computes and writes each generation. Every other
+worker is a follower: it memory-maps the current generation and re-maps when
+CURRENT names a new one, so the column data sits once in the page cache no
+matter how many workers there are. A follower retries the lock on every
+poll and takes over when the leader exits (the OS drops its lock).
+
+Followers pass manual refreshes on to the leader through a request file.
+The default mode, "standalone", keeps the old behaviour: every process
+refreshes on its own.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, shared mode falls back to standalone
+    fcntl = None
+
+SNAPSHOT_MODE = os.environ.get("TECHNICAL_SNAPSHOT_MODE", "standalone")
+FOLLOW_INTERVAL = float(os.environ.get("TECHNICAL_FOLLOW_INTERVAL", 2))
+SHARED_AVAILABLE = fcntl is not None
+
+
+class LeaderLock:
+    def __init__(self, root):
+        self.path = os.path.join(root, "leader.lock")
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def acquire(self):
+        """Tries to become the leader without blocking; returns True when held."""
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def leader_pid(self):
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+
+def trim_heap():
+    """
+    Hands freed heap memory back to the OS (glibc only). Building a snapshot
+    from mapped columns leaves large freed temporaries in the heap, which
+    would otherwise stay resident in every follower.
+    """
+    try:
+        ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def request_refresh(root, full=False, verify=False):
+    """Asks the leader for a refresh (picked up on its next poll)."""
+    tmp = os.path.join(root, f".REFRESH.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"full": full, "verify": verify}, f)
+    os.replace(tmp, os.path.join(root, "REFRESH"))
+
+
+def take_refresh_request(root):
+    """Returns and clears a pending refresh request, or None."""
+    path = os.path.join(root, "REFRESH")
+    try:
+        with open(path) as f:
+            request = json.load(f)
+        os.remove(path)
+    except (OSError, ValueError):
+        return None
+    return {"full": bool(request.get("full")), "verify": bool(request.get("verify"))}
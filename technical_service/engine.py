@@ -0,0 +1,378 @@
+"""
+Vectorized indicator engine.
+
+Works on the whole (symbol, date) sorted history at once: indicators are
+computed with grouped / whole-column operations and the per-symbol tables are
+built from the last two bars of every symbol using array indexing, instead of
+copying each group and reading rows with iloc.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+from shared.constants import (
+    RSI_PERIOD, MA_PERIOD, MA_50, MA_200
+)
+
+VOL_AVG_PERIOD = 20
+WINDOW_52W = 250
+PRICE_DECIMALS = 2
+
+REQUIRED_COLUMNS = {"date", "symbol", "open", "high", "low", "close", "volume"}
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+INDICATOR_COLUMNS = ["rsi", "ma20", "sma50", "sma200", "vol_avg20"]
+TABLES = ["rsi", "ma", "crossover", "candlestick", "momentum", "volume_shocker"]
+
+CANDLE_PATTERNS = ["Neutral", "Hammer (Bullish)", "Shooting Star (Bearish)", "Bullish Engulfing", "Bearish Engulfing"]
+
+TABLE_COLUMNS = {
+    "rsi": ["symbol", "close", "rsi"],
+    "ma": ["symbol", "close", "ma", "percent_diff"],
+    "crossover": ["symbol", "close", "sma50", "sma200", "signal", "is_cross"],
+    "candlestick": ["symbol", "close", "pattern"],
+    "momentum": ["symbol", "close", "vol_ratio", "high_52", "low_52", "rs_score", "breakout"],
+    "volume_shocker": ["symbol", "close", "volume", "vol_avg_20", "vol_ratio", "shock_level"],
+}
+
+
+def read_sheet(source):
+    """
+    Parses the history sheet from a path or binary file, reading only the
+    required columns. Symbol and date are read as categoricals since both
+    repeat heavily. Returns None when required columns are missing.
+    """
+    rewind = source.tell() if hasattr(source, "seek") else None
+    header = pd.read_csv(source, nrows=0).columns
+    if rewind is not None:
+        source.seek(rewind)
+    names = {name: name.strip().lower() for name in header if name.strip().lower() in REQUIRED_COLUMNS}
+    if set(names.values()) != REQUIRED_COLUMNS:
+        return None
+    dtypes = {name: "category" for name, column in names.items() if column in ("symbol", "date")}
+    df = pd.read_csv(source, usecols=list(names), dtype=dtypes)
+    return prepare_history(df.rename(columns=names))
+
+
+def _dates(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Parse each distinct date string once
+        dates = pd.to_datetime(values.cat.categories, errors="coerce")
+        return dates.take(values.cat.codes.to_numpy(), allow_fill=True)
+    return pd.to_datetime(values, errors="coerce")
+
+
+def _symbols(values):
+    values = values.astype("category")
+    names = values.cat.categories.astype(str)
+    return values.cat.rename_categories(names).cat.reorder_categories(names.sort_values())
+
+
+def _numeric(values):
+    if values.dtype.kind == "f":
+        return values.to_numpy()
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _compact(values, block=1 << 18):
+    # float32 when that is lossless at PRICE_DECIMALS (checked block-wise to
+    # keep the temporaries small); float_values() undoes it
+    narrow = values.astype(np.float32)
+    for start in range(0, len(values), block):
+        part = slice(start, start + block)
+        wide = np.round(narrow[part].astype(np.float64), PRICE_DECIMALS)
+        if not np.array_equal(wide, values[part], equal_nan=True):
+            return values
+    return narrow
+
+
+def float_values(values):
+    """float64 array of a column, undoing the float32 storage of prices."""
+    if values.dtype == np.float32:
+        return np.round(values.to_numpy(dtype=np.float64), PRICE_DECIMALS)
+    return values.to_numpy(dtype=np.float64)
+
+
+def prepare_history(df):
+    """
+    Normalizes the raw sheet into a (symbol, date) sorted frame with a
+    categorical symbol and prices stored as float32 where that is lossless.
+    Returns None when required columns are missing.
+    """
+    df.columns = df.columns.str.strip().str.lower()
+    if not REQUIRED_COLUMNS.issubset(df.columns):
+        return None
+
+    dates = _dates(df["date"]).to_numpy()
+    symbols = _symbols(df["symbol"])
+    codes = symbols.cat.codes.to_numpy()
+    close = _numeric(df["close"])
+
+    # Drop incomplete rows and sort, building every column once in its final dtype
+    keep = np.flatnonzero((codes >= 0) & ~np.isnat(dates) & ~np.isnan(close))
+    order = keep[np.lexsort((dates[keep], codes[keep]))]
+    columns = {
+        "date": dates[order],
+        "symbol": pd.Categorical.from_codes(codes[order], categories=symbols.cat.categories).remove_unused_categories(),
+    }
+    for col in PRICE_COLUMNS:
+        values = close if col == "close" else _numeric(df[col])
+        columns[col] = _compact(values[order])
+    return pd.DataFrame(columns, copy=False)
+
+
+def indicator_universe(df):
+    """Drops junk symbols (containing digits) and symbols with fewer than two bars."""
+    counts = df["symbol"].value_counts()
+    names = counts.index.to_series()
+    valid = names[(counts >= 2) & ~names.str.contains(r"\d", regex=True)]
+    keep = df["symbol"].isin(valid)
+    return df.loc[keep, ["date", "symbol"] + PRICE_COLUMNS].reset_index(drop=True)
+
+
+def symbol_offsets(symbols):
+    """Returns (names, starts, ends) for a grouped, sorted symbol column."""
+    values = np.asarray(symbols)
+    if len(values) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0, dtype=object), empty, empty
+    starts = np.r_[0, np.flatnonzero(values[1:] != values[:-1]) + 1]
+    ends = np.r_[starts[1:], len(values)]
+    return values[starts], starts, ends
+
+
+def _positions(starts, ends):
+    """Position of every row within its symbol."""
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(starts, ends - starts)
+
+
+class _SymbolWindow(BaseIndexer):
+    """Trailing windows clipped at the first row of each row's symbol."""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        return np.maximum(end - self.window_size, self.first), end
+
+
+def _rolling_mean(values, window, first):
+    # One rolling pass over the whole column. Clipping the windows at `first`
+    # (index of the first row of each row's symbol) makes pandas restart its
+    # running sum at every symbol, so the means are bit-for-bit those of a
+    # per-symbol rolling(window).mean(); rows with fewer than `window` bars
+    # of history come out NaN.
+    indexer = _SymbolWindow(window_size=window, first=np.asarray(first, dtype=np.int64))
+    return pd.Series(values).rolling(indexer, min_periods=window).mean().to_numpy(copy=True)
+
+
+def _wilder_averages(delta, starts, ends):
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    codes = np.repeat(np.arange(len(starts), dtype=np.int32), ends - starts)
+    # One column at a time keeps only one grouped result alive
+    ewm = lambda values: pd.Series(values, copy=False).groupby(codes, sort=False).ewm(alpha=1 / RSI_PERIOD).mean().to_numpy(copy=True)
+    return ewm(gain), ewm(loss)
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def compute_indicators(hist):
+    """
+    Adds avg_gain/avg_loss, rsi, ma20, sma50, sma200 and vol_avg20 to a frame
+    produced by indicator_universe. Returns (hist, offsets).
+    """
+    offsets = symbol_offsets(hist["symbol"])
+    _, starts, ends = offsets
+    pos = _positions(starts, ends)
+    close = float_values(hist["close"])
+    volume = float_values(hist["volume"])
+
+    delta = np.empty_like(close)
+    delta[1:] = close[1:] - close[:-1]
+    delta[starts] = np.nan
+    avg_gain, avg_loss = _wilder_averages(delta, starts, ends)
+    rsi = rsi_from_averages(avg_gain, avg_loss)
+    rsi[pos < RSI_PERIOD - 1] = np.nan
+
+    hist["avg_gain"] = avg_gain
+    hist["avg_loss"] = avg_loss
+    hist["rsi"] = rsi
+    first = np.repeat(starts, ends - starts)
+    hist["ma20"] = _rolling_mean(close, MA_PERIOD, first)
+    hist["sma50"] = _rolling_mean(close, MA_50, first)
+    hist["sma200"] = _rolling_mean(close, MA_200, first)
+    hist["vol_avg20"] = _rolling_mean(volume, VOL_AVG_PERIOD, first)
+    return hist, offsets
+
+
+def _window_reduce(ufunc, values, starts, ends):
+    # reduceat over the (start, end) pairs; the padding slot keeps the final
+    # end index in range and every odd result is discarded.
+    padded = np.append(values, np.nan)
+    idx = np.empty(2 * len(starts), dtype=np.int64)
+    idx[0::2] = starts
+    idx[1::2] = ends
+    return ufunc.reduceat(padded, idx)[0::2]
+
+
+def latest_frame(hist, offsets):
+    """One row per symbol with everything the tables need from the last bars."""
+    names, starts, ends = offsets
+    last, prev = ends - 1, ends - 2
+    bars = ends - starts
+    columns = {}
+    col = lambda name: columns.get(name) if name in columns else columns.setdefault(name, float_values(hist[name]))
+
+    close = col("close")
+    win_start = np.maximum(starts, ends - WINDOW_52W)
+    has_250 = bars >= WINDOW_52W
+    close_250 = np.full(len(names), np.nan)
+    close_250[has_250] = close[(ends - WINDOW_52W)[has_250]]
+
+    latest = {"symbol": pd.Series(names, dtype=object).str.upper().to_numpy(), "bars": bars}
+    for name in ["open", "high", "low", "close", "volume"] + INDICATOR_COLUMNS:
+        latest[name] = col(name)[last]
+    for name in ["open", "high", "low", "close", "sma50", "sma200"]:
+        latest[f"prev_{name}"] = col(name)[prev]
+    latest["high_52"] = _window_reduce(np.fmax, col("high"), win_start, ends)
+    latest["low_52"] = _window_reduce(np.fmin, col("low"), win_start, ends)
+    latest["close_250"] = close_250
+    return pd.DataFrame(latest)
+
+
+def candle_codes(o, h, l, c, po, pc):
+    """Index into CANDLE_PATTERNS of the pattern of every bar (0 = Neutral)."""
+    body = np.abs(c - o)
+    candle_range = h - l
+    with np.errstate(divide="ignore", invalid="ignore"):
+        body_percent = body / candle_range
+    upper_wick = h - np.maximum(o, c)
+    lower_wick = np.minimum(o, c) - l
+    flat = candle_range == 0
+    hammer = (lower_wick > 2 * body) & (upper_wick < 0.1 * candle_range) & (body_percent < 0.4)
+    star = (upper_wick > 2 * body) & (lower_wick < 0.1 * candle_range) & (body_percent < 0.4)
+    bull = (c > o) & (pc < po) & (c > po) & (o < pc)
+    bear = (c < o) & (pc > po) & (c < po) & (o > pc)
+    return np.select([flat, hammer, star, bull, bear], [0, 1, 2, 3, 4], 0).astype(np.int8)
+
+
+def _candle_patterns(o, h, l, c, po, pc):
+    return np.asarray(CANDLE_PATTERNS)[candle_codes(o, h, l, c, po, pc)]
+
+
+def cross_masks(p50, p200, s50, s200):
+    """Golden / Death Cross masks from the previous and current SMA50/SMA200."""
+    return (p50 <= p200) & (s50 > s200), (p50 >= p200) & (s50 < s200)
+
+
+def _frame(table, data, mask):
+    return pd.DataFrame({k: np.asarray(v)[mask] for k, v in data.items()}, columns=TABLE_COLUMNS[table])
+
+
+def _round(values, decimals):
+    # Python's round works from the exact value of the double, as the
+    # per-symbol loop did; np.round scales first and can land a cent off
+    # on half-way values (e.g. 410.695)
+    return np.array([round(v, decimals) for v in np.asarray(values, dtype=np.float64).tolist()])
+
+
+def build_tables(latest):
+    """Builds the rsi/ma/crossover/candlestick/momentum/volume_shocker tables."""
+    symbol, close = latest["symbol"].to_numpy(), latest["close"].to_numpy()
+    vol = latest["volume"].to_numpy()
+    ma20, rsi = latest["ma20"].to_numpy(), latest["rsi"].to_numpy()
+    s50, s200 = latest["sma50"].to_numpy(), latest["sma200"].to_numpy()
+    p50, p200 = latest["prev_sma50"].to_numpy(), latest["prev_sma200"].to_numpy()
+    vavg = latest["vol_avg20"].to_numpy()
+    h52, l52 = latest["high_52"].to_numpy(), latest["low_52"].to_numpy()
+    bars = latest["bars"].to_numpy()
+    everyone = np.ones(len(symbol), dtype=bool)
+    tables = {}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tables["rsi"] = _frame("rsi", {"symbol": symbol, "close": close, "rsi": _round(rsi, 2)}, ~np.isnan(rsi))
+
+        tables["ma"] = _frame("ma", {
+            "symbol": symbol, "close": close, "ma": _round(ma20, 2),
+            "percent_diff": _round((close - ma20) / ma20 * 100, 2),
+        }, ~np.isnan(ma20))
+
+        golden, death = cross_masks(p50, p200, s50, s200)
+        signal = np.select([golden, death, s50 > s200],
+                           ["Golden Cross", "Death Cross", "Bullish Alignment"], "Bearish Alignment")
+        tables["crossover"] = _frame("crossover", {
+            "symbol": symbol, "close": close, "sma50": _round(s50, 2), "sma200": _round(s200, 2),
+            "signal": signal, "is_cross": golden | death,
+        }, (bars >= MA_200) & ~np.isnan(s200))
+
+        pattern = _candle_patterns(
+            latest["open"].to_numpy(), latest["high"].to_numpy(), latest["low"].to_numpy(), close,
+            latest["prev_open"].to_numpy(), latest["prev_close"].to_numpy(),
+        )
+        tables["candlestick"] = _frame("candlestick", {"symbol": symbol, "close": close, "pattern": pattern},
+                                       pattern != "Neutral")
+
+        v_avg = np.where(np.isnan(vavg), 0, vavg)
+        vol_ratio = np.where(v_avg > 0, vol / v_avg, 0)
+        rs_score = np.where(bars >= WINDOW_52W, close / latest["close_250"].to_numpy() * 100, 0)
+        breakout = np.select([close >= h52, close <= l52], ["High", "Low"], "Neutral")
+        tables["momentum"] = _frame("momentum", {
+            "symbol": symbol, "close": close, "vol_ratio": _round(vol_ratio, 2),
+            "high_52": h52, "low_52": l52, "rs_score": _round(rs_score, 2), "breakout": breakout,
+        }, everyone)
+
+        valid = ~np.isnan(vavg) & (vavg != 0) & ~np.isnan(vol)
+        shock_ratio = vol / vavg
+        level = np.select([shock_ratio >= 3.0, shock_ratio >= 2.5, shock_ratio >= 2.0],
+                          ["Extreme", "High", "Moderate"], "Normal")
+        tables["volume_shocker"] = _frame("volume_shocker", {
+            "symbol": symbol, "close": close, "volume": vol, "vol_avg_20": _round(vavg, 0),
+            "vol_ratio": _round(shock_ratio, 2), "shock_level": level,
+        }, valid & (level != "Normal"))
+
+    return tables
+
+
+def compute_tables(df):
+    """Full pipeline from a prepared history to the indicator tables."""
+    hist = indicator_universe(df)
+    if hist.empty:
+        return empty_tables()
+    hist, offsets = compute_indicators(hist)
+    return build_tables(latest_frame(hist, offsets))
+
+
+def empty_tables():
+    return {name: pd.DataFrame(columns=TABLE_COLUMNS[name]) for name in TABLES}
+
+
+def compare_tables(expected, actual, atol=0.0):
+    """Returns {table: number of mismatching rows} for two sets of tables."""
+    report = {}
+    for name in TABLES:
+        a, b = expected.get(name, pd.DataFrame()), actual.get(name, pd.DataFrame())
+        if a.empty or b.empty or len(a) != len(b):
+            report[name] = 0 if a.empty and b.empty else max(len(a), len(b))
+            continue
+        bad = np.zeros(len(a), dtype=bool)
+        for column in TABLE_COLUMNS[name]:
+            x, y = a[column].to_numpy(), b[column].to_numpy()
+            if x.dtype.kind == "f" or y.dtype.kind == "f":
+                bad |= ~np.isclose(x.astype(float), y.astype(float), rtol=0, atol=atol, equal_nan=True)
+            else:
+                bad |= x != y
+        report[name] = int(bad.sum())
+    return report
+
+
+def check_parity(df):
+    """
+    Compares the vectorized engine against logic.build_tables_per_symbol on a
+    prepared history; the reference gets the prices back as float64, as it
+    did when it read the sheet itself.
+    """
+    from technical_service.logic import build_tables_per_symbol
+    wide = df.copy()
+    for col in PRICE_COLUMNS:
+        wide[col] = float_values(df[col])
+    return compare_tables(build_tables_per_symbol(wide), compute_tables(df))
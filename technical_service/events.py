@@ -0,0 +1,147 @@
+"""
+Historical candlestick and SMA50/SMA200 cross events.
+
+The pattern and cross rules of the tables are evaluated as boolean masks over
+the whole (symbol, date) sorted history in one pass, with the previous bar
+taken from the row before within the same symbol. Hits are kept as a compact
+event index: history row, symbol code and event type, in row order, so a
+symbol's events are one contiguous run and a date window is a mask on the
+event dates.
+"""
+import numpy as np
+import pandas as pd
+
+from technical_service.engine import CANDLE_PATTERNS, candle_codes, cross_masks, float_values
+
+CANDLE_EVENTS = CANDLE_PATTERNS[1:]
+CROSS_EVENTS = ["Golden Cross", "Death Cross"]
+EVENT_TYPES = CANDLE_EVENTS + CROSS_EVENTS
+DEFAULT_DAYS = 30
+
+
+class EventError(ValueError):
+    pass
+
+
+def _previous(values, first):
+    prev = np.empty_like(values)
+    prev[1:] = values[:-1]
+    prev[first] = np.nan
+    return prev
+
+
+def scan_events(hist, offsets):
+    """Returns (row, code, type) arrays of every event in `hist`, in row order."""
+    names, starts, ends = offsets
+    first = starts[ends > starts]
+    o, h, l, c = (float_values(hist[name]) for name in ("open", "high", "low", "close"))
+    kinds = candle_codes(o, h, l, c, _previous(o, first), _previous(c, first)).astype(np.int8) - 1
+    # detect_candlestick needs two bars, so the first bar of a symbol never counts
+    kinds[first] = -1
+
+    s50, s200 = hist["sma50"].to_numpy(), hist["sma200"].to_numpy()
+    golden, death = cross_masks(_previous(s50, first), _previous(s200, first), s50, s200)
+    crosses = np.where(golden, 0, np.where(death, 1, -1)) + len(CANDLE_EVENTS)
+
+    candle_rows = np.flatnonzero(kinds >= 0)
+    cross_rows = np.flatnonzero(golden | death)
+    rows = np.concatenate([candle_rows, cross_rows])
+    types = np.concatenate([kinds[candle_rows], crosses[cross_rows]]).astype(np.int8)
+    order = np.argsort(rows, kind="stable")
+    rows, types = rows[order], types[order]
+    codes = (np.searchsorted(starts, rows, side="right") - 1).astype(np.int32)
+    return rows, codes, types
+
+
+class EventIndex:
+    def __init__(self, history=None, offsets=None):
+        self.names = []
+        self.symbols = {}
+        self.rows = np.empty(0, dtype=np.int64)
+        self.codes = np.empty(0, dtype=np.int32)
+        self.types = np.empty(0, dtype=np.int8)
+        self.sessions = self.dates = np.empty(0, dtype="datetime64[ns]")
+        self.close = self.sma50 = self.sma200 = np.empty(0)
+        if offsets is None or len(history) == 0:
+            return
+        names = offsets[0]
+        self.names = [str(name).upper() for name in names]
+        self.symbols = {name: i for i, name in enumerate(self.names)}
+        self.rows, self.codes, self.types = scan_events(history, offsets)
+        dates = history["date"].to_numpy()
+        self.sessions = np.unique(dates)
+        self.dates = dates[self.rows]
+        self.close = float_values(history["close"].iloc[self.rows])
+        self.sma50 = np.round(history["sma50"].to_numpy()[self.rows], 2)
+        self.sma200 = np.round(history["sma200"].to_numpy()[self.rows], 2)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _types(self, group, pattern):
+        allowed = [EVENT_TYPES.index(name) for name in group]
+        if pattern:
+            wanted = pattern.strip().lower()
+            allowed = [t for t in allowed
+                       if EVENT_TYPES[t].lower() == wanted or EVENT_TYPES[t].split(" (")[0].lower() == wanted]
+            if not allowed:
+                raise EventError(f"Unknown pattern: {pattern}. Use one of: {', '.join(group)}")
+        return allowed
+
+    def select(self, group, days=DEFAULT_DAYS, symbol=None, pattern=None):
+        """Event ids of `group` in the last `days` sessions, newest first."""
+        lo, hi = 0, len(self.rows)
+        if symbol:
+            code = self.symbols.get(symbol.upper())
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            lo, hi = np.searchsorted(self.codes, [code, code + 1])
+        mask = np.isin(self.types[lo:hi], self._types(group, pattern))
+        if days and len(self.sessions):
+            mask &= self.dates[lo:hi] >= self.sessions[-min(days, len(self.sessions))]
+        ids = lo + np.flatnonzero(mask)
+        # newest first, then by symbol
+        return ids[np.lexsort((self.codes[ids], -self.dates[ids].astype(np.int64)))]
+
+    def render(self, ids, crosses=False):
+        data = {
+            "symbol": np.asarray(self.names, dtype=object)[self.codes[ids]],
+            "date": np.datetime_as_string(self.dates[ids], unit="D"),
+            "signal" if crosses else "pattern": np.asarray(EVENT_TYPES, dtype=object)[self.types[ids]],
+            "close": self.close[ids],
+        }
+        if crosses:
+            data["sma50"] = self.sma50[ids]
+            data["sma200"] = self.sma200[ids]
+        return pd.DataFrame(data).to_json(orient="records").encode()
+
+
+def check_parity(df):
+    """
+    Compares the last-bar events with logic.detect_candlestick and the
+    crossover signals of logic.build_tables_per_symbol; returns mismatch counts.
+    """
+    from technical_service.engine import indicator_universe, compute_indicators
+    from technical_service.logic import detect_candlestick, build_tables_per_symbol
+
+    hist, offsets = compute_indicators(indicator_universe(df))
+    index = EventIndex(hist, offsets)
+    names, starts, ends = offsets
+    last = {}
+    for i in range(len(index)):
+        if index.rows[i] == ends[index.codes[i]] - 1:
+            last.setdefault(index.codes[i], set()).add(EVENT_TYPES[index.types[i]])
+
+    candles = 0
+    for code, (start, end) in enumerate(zip(starts, ends)):
+        expected = detect_candlestick(hist.iloc[start:end])
+        actual = last.get(code, set()) & set(CANDLE_EVENTS)
+        candles += actual != ({expected} if expected != "Neutral" else set())
+
+    crossover = build_tables_per_symbol(df)["crossover"].set_index("symbol")["signal"]
+    crosses = 0
+    for code, name in enumerate(index.names):
+        expected = crossover.get(name)
+        expected = {expected} if expected in CROSS_EVENTS else set()
+        crosses += (last.get(code, set()) & set(CROSS_EVENTS)) != expected
+    return {"candlestick": int(candles), "crossover": int(crosses)}
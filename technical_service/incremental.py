@@ -0,0 +1,179 @@
+"""
+Incremental indicator updates.
+
+A refresh usually only appends the latest session to each symbol. Instead of
+recomputing the whole history, the previous indicator history is kept and
+every symbol is classified against the new sheet:
+
+- unchanged: identical rows, indicators are copied over
+- append:    old rows untouched and new bars at the end; the Wilder RSI
+             averages continue from the last stored state and each moving
+             average of a new bar is summed from the window of bars before it
+- rebuild:   anything else (new symbol, edited or removed rows); that symbol
+             is recomputed from scratch with the batch engine
+
+Old rows are checked against the stored history column by column, and only
+the new bars (plus the windows they need) are read, so a refresh that adds
+one session costs little more than copying the stored indicators. The new
+bars' values can differ from a full rebuild in the last few ulps (pandas
+accumulates its window sums from the start of each symbol); check_incremental
+accepts that.
+"""
+import numpy as np
+import pandas as pd
+from shared.constants import RSI_PERIOD, MA_PERIOD, MA_50, MA_200
+from technical_service.engine import (
+    PRICE_COLUMNS, INDICATOR_COLUMNS, VOL_AVG_PERIOD,
+    indicator_universe, compute_indicators, symbol_offsets, rsi_from_averages,
+    _positions, float_values, latest_frame, build_tables, compare_tables,
+)
+
+STATE_COLUMNS = ["avg_gain", "avg_loss"] + INDICATOR_COLUMNS
+ROLLING = [("ma20", "close", MA_PERIOD), ("sma50", "close", MA_50),
+           ("sma200", "close", MA_200), ("vol_avg20", "volume", VOL_AVG_PERIOD)]
+
+UNCHANGED, APPEND, REBUILD = 0, 1, 2
+# Indicators of new bars agree with a full rebuild to this (absolute) tolerance
+INDICATOR_ATOL = 1e-9
+# Tables round to cents, so a last-ulp difference on a half-way value can
+# show up as one cent; anything larger is a real mismatch
+TABLE_ATOL = 0.0101
+
+
+def _edited_rows(prev_hist, hist, old_row, has_old):
+    """Rows of `hist` whose date or prices differ from their row in `prev_hist`."""
+    new = np.flatnonzero(has_old)
+    old = old_row[new]
+    edited = prev_hist["date"].to_numpy()[old] != hist["date"].to_numpy()[new]
+    for col in PRICE_COLUMNS:
+        a, b = prev_hist[col].to_numpy(), hist[col].to_numpy()
+        if a.dtype != b.dtype:
+            # one side stored as float32, the other not: compare the float64 values
+            a, b = float_values(prev_hist[col]), float_values(hist[col])
+        a, b = a[old], b[new]
+        edited |= (a != b) & ~(np.isnan(a) & np.isnan(b))
+    return new[edited]
+
+
+def full_indicators(df):
+    return compute_indicators(indicator_universe(df))
+
+
+def _classify(prev_hist, prev_offsets, hist, offsets):
+    """Returns per-symbol status and old bar count, plus per-row symbol code, position and old row (or -1)."""
+    names, starts, ends = offsets
+    old_names, old_starts, old_ends = prev_offsets
+    old_idx = pd.Index(old_names).get_indexer(names)
+    old_bars = np.where(old_idx >= 0, (old_ends - old_starts)[old_idx], 0)
+    bars = ends - starts
+    code = np.repeat(np.arange(len(names)), bars)
+    pos = _positions(starts, ends)
+    has_old = pos < old_bars[code]
+    old_row = np.where(has_old, old_starts[old_idx[code]] + pos, -1)
+
+    dirty = np.zeros(len(names), dtype=bool)
+    dirty[code[_edited_rows(prev_hist, hist, old_row, has_old)]] = True
+
+    status = np.where(bars > old_bars, APPEND, UNCHANGED)
+    status[(old_idx < 0) | (bars < old_bars) | dirty] = REBUILD
+    return status, old_bars, code, pos, old_row
+
+
+def _append(hist, offsets, out, status, old_bars, code, pos, old_row):
+    names, starts, ends = offsets
+    appended = status[code] == APPEND
+    new_rows = np.flatnonzero(appended & (old_row < 0))
+    if len(new_rows) == 0:
+        return
+
+    # Moving averages: each new bar's mean is the sum of its window (the
+    # bars before it are stored, so only new_rows x window values are read)
+    first_new = starts + old_bars
+    for column, source, window in ROLLING:
+        idx = np.maximum(new_rows[:, None] - np.arange(window), 0)
+        values = float_values(hist[source].iloc[idx.ravel()]).reshape(idx.shape)
+        means = values.sum(axis=1) / window
+        means[pos[new_rows] < window - 1] = np.nan
+        out[column][new_rows] = means
+
+    # Wilder averages: pandas' adjusted EWM is weighted_mean_n with weights
+    # beta^i, so the running weight after n bars is sum(beta^i, i < n).
+    beta = 1 - 1 / RSI_PERIOD
+    close = float_values(hist["close"].iloc[new_rows])
+    prev_close = float_values(hist["close"].iloc[new_rows - 1])
+    avg_gain, avg_loss = out["avg_gain"], out["avg_loss"]
+    step = new_rows - first_new[code[new_rows]]
+    for k in range(step.max() + 1):
+        pick = step == k
+        rows = new_rows[pick]
+        prev, n = rows - 1, pos[rows]
+        weight = beta * (1 - beta ** n) / (1 - beta)
+        delta = close[pick] - prev_close[pick]
+        avg_gain[rows] = (weight * avg_gain[prev] + np.where(delta > 0, delta, 0.0)) / (weight + 1)
+        avg_loss[rows] = (weight * avg_loss[prev] + np.where(delta < 0, -delta, 0.0)) / (weight + 1)
+    rsi = rsi_from_averages(avg_gain[new_rows], avg_loss[new_rows])
+    rsi[pos[new_rows] < RSI_PERIOD - 1] = np.nan
+    out["rsi"][new_rows] = rsi
+
+
+def update_indicators(prev, df):
+    """
+    Updates the indicator history for a freshly prepared sheet.
+    `prev` is the (hist, offsets) pair of the last run, or None for a full build.
+    Returns (hist, offsets, stats).
+    """
+    if prev is None or prev[0].empty:
+        hist, offsets = full_indicators(df)
+        return hist, offsets, {"mode": "full", "rebuilt": len(offsets[0]), "appended": 0, "unchanged": 0}
+
+    prev_hist, prev_offsets = prev
+    hist = indicator_universe(df)
+    offsets = symbol_offsets(hist["symbol"])
+    status, old_bars, code, pos, old_row = _classify(prev_hist, prev_offsets, hist, offsets)
+
+    out = {name: np.full(len(hist), np.nan) for name in STATE_COLUMNS}
+    reuse = (status[code] != REBUILD) & (old_row >= 0)
+    for name in STATE_COLUMNS:
+        out[name][reuse] = prev_hist[name].to_numpy()[old_row[reuse]]
+
+    rebuild = np.flatnonzero(status[code] == REBUILD)
+    if len(rebuild):
+        part, _ = compute_indicators(hist.iloc[rebuild].reset_index(drop=True))
+        for name in STATE_COLUMNS:
+            out[name][rebuild] = part[name].to_numpy()
+
+    _append(hist, offsets, out, status, old_bars, code, pos, old_row)
+    for name in STATE_COLUMNS:
+        hist[name] = out[name]
+
+    stats = {
+        "mode": "incremental",
+        "rebuilt": int((status == REBUILD).sum()),
+        "appended": int((status == APPEND).sum()),
+        "unchanged": int((status == UNCHANGED).sum()),
+    }
+    return hist, offsets, stats
+
+
+def check_incremental(prev, df, atol=INDICATOR_ATOL, table_atol=TABLE_ATOL):
+    """
+    Runs the incremental update and a full recompute on the same sheet and
+    reports the largest indicator difference and any table mismatches
+    (beyond `atol` and `table_atol`, see INDICATOR_ATOL / TABLE_ATOL).
+    """
+    hist, offsets, _ = update_indicators(prev, df)
+    full, full_offsets = full_indicators(df)
+    diffs, missing = {}, {}
+    for name in STATE_COLUMNS:
+        a, b = hist[name].to_numpy(), full[name].to_numpy()
+        diffs[name] = float(np.nanmax(np.abs(a - b), initial=0.0)) if len(a) == len(b) else None
+        missing[name] = int((np.isnan(a) != np.isnan(b)).sum()) if len(a) == len(b) else None
+    tables = compare_tables(build_tables(latest_frame(full, full_offsets)), build_tables(latest_frame(hist, offsets)),
+                            atol=table_atol)
+    return {
+        "consistent": all(d is not None and d <= atol for d in diffs.values())
+                      and not any(missing.values()) and not any(tables.values()),
+        "max_abs_diff": diffs,
+        "nan_mismatches": missing,
+        "table_mismatches": tables,
+    }
@@ -66,3 +66,82 @@ def detect_volume_shocker(df, vol_avg_20):
         shock_level = "Normal"
     
     return shock_level, round(vol_ratio, 2)
+
+
+def build_tables_per_symbol(df):
+    """
+    Reference implementation: builds the indicator tables one symbol at a time.
+    Kept so the vectorized engine can be checked against it (see engine.check_parity).
+    """
+    rsi_list, ma_list, cross_list, candle_list, momentum_list = [], [], [], [], []
+    volume_shocker_list = []
+
+    for symbol, g in df.groupby("symbol"):
+        symbol_str = str(symbol).upper()
+        if any(char.isdigit() for char in symbol_str): continue
+        g = g.copy()
+        if len(g) < 2: continue
+
+        g["rsi"] = calculate_rsi(g["close"], RSI_PERIOD)
+        g["ma20"] = calculate_ma(g["close"], MA_PERIOD)
+        g["sma50"] = calculate_ma(g["close"], MA_50)
+        g["sma200"] = calculate_ma(g["close"], MA_200)
+        g["vol_avg20"] = calculate_ma(g["volume"], 20)
+
+        last = g.iloc[-1]
+        prev = g.iloc[-2]
+
+        if not pd.isna(last["rsi"]):
+            rsi_list.append({"symbol": symbol_str, "close": float(last["close"]), "rsi": round(float(last["rsi"]), 2)})
+
+        ma_dist_pct = 0
+        if not pd.isna(last["ma20"]):
+            ma_dist_pct = (last["close"] - last["ma20"]) / last["ma20"] * 100
+            ma_list.append({
+                "symbol": symbol_str, "close": float(last["close"]),
+                "ma": round(float(last["ma20"]), 2), "percent_diff": round(float(ma_dist_pct), 2)
+            })
+
+        if len(g) >= MA_200 and not pd.isna(last["sma200"]):
+            signal = "Golden Cross" if (prev["sma50"] <= prev["sma200"] and last["sma50"] > last["sma200"]) else \
+                     "Death Cross" if (prev["sma50"] >= prev["sma200"] and last["sma50"] < last["sma200"]) else \
+                     "Bullish Alignment" if last["sma50"] > last["sma200"] else "Bearish Alignment"
+            cross_list.append({
+                "symbol": symbol_str, "close": float(last["close"]),
+                "sma50": round(float(last["sma50"]), 2), "sma200": round(float(last["sma200"]), 2),
+                "signal": signal, "is_cross": ("Cross" in signal)
+            })
+
+        pattern = detect_candlestick(g)
+        if pattern != "Neutral":
+            candle_list.append({"symbol": symbol_str, "close": float(last["close"]), "pattern": pattern})
+
+        v_avg = last["vol_avg20"] if not pd.isna(last["vol_avg20"]) else 0
+        vol_ratio = last["volume"] / v_avg if v_avg > 0 else 0
+        win_52 = g.tail(250)
+        h52 = win_52["high"].max()
+        l52 = win_52["low"].min()
+        rs_score = (last["close"] / g.iloc[-250]["close"] * 100) if len(g) >= 250 else 0
+
+        momentum_list.append({
+            "symbol": symbol_str, "close": float(last["close"]), "vol_ratio": round(float(vol_ratio), 2),
+            "high_52": float(h52), "low_52": float(l52), "rs_score": round(float(rs_score), 2),
+            "breakout": "High" if last["close"] >= h52 else "Low" if last["close"] <= l52 else "Neutral"
+        })
+
+        shock_level, shock_ratio = detect_volume_shocker(g, last["vol_avg20"])
+        if shock_level != "Normal":
+            volume_shocker_list.append({
+                "symbol": symbol_str, "close": float(last["close"]), "volume": float(last["volume"]),
+                "vol_avg_20": round(float(last["vol_avg20"]), 0), "vol_ratio": shock_ratio,
+                "shock_level": shock_level
+            })
+
+    return {
+        "rsi": pd.DataFrame(rsi_list),
+        "ma": pd.DataFrame(ma_list),
+        "crossover": pd.DataFrame(cross_list),
+        "candlestick": pd.DataFrame(candle_list),
+        "momentum": pd.DataFrame(momentum_list),
+        "volume_shocker": pd.DataFrame(volume_shocker_list),
+    }
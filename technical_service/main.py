@@ -1,25 +1,57 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import httpx
-import pandas as pd
+from fastapi.responses import Response
 import asyncio
-import json
+import hashlib
 import os
+import time
 import uvicorn
 import sys
-from io import StringIO
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from types import MappingProxyType
 
 # Add shared directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from shared.constants import (
-    GOOGLE_SHEET_CSV, RSI_PERIOD, MA_PERIOD, MA_50, MA_200
-)
-from technical_service.logic import (
-    calculate_rsi, calculate_ma, detect_candlestick, detect_volume_shocker
+from shared.constants import GOOGLE_SHEET_CSV
+from shared.market_hours import nepal_now, market_phase, next_phase_change
+from shared.payloads import serve_payload
+from shared.upstream import UPSTREAM, upstream_client
+from shared.metrics import instrument, counter, gauge, histogram, profiling, profile_response
+from technical_service.snapshot import Snapshot, build_snapshot
+from technical_service.persist import SCHEMA_VERSION, SNAPSHOT_DIR, current_generation_dir, load_snapshot, save_snapshot
+from technical_service.coordination import (
+    SNAPSHOT_MODE, SHARED_AVAILABLE, FOLLOW_INTERVAL, LeaderLock, request_refresh, take_refresh_request, trim_heap,
 )
-
-app = FastAPI(title="NEPSE Technical Service")
+from technical_service.screener import ScreenerError
+from technical_service.series import SeriesError
+from technical_service.events import CANDLE_EVENTS, CROSS_EVENTS, DEFAULT_DAYS, EventError
+
+@asynccontextmanager
+async def lifespan(app):
+    global ROLE
+    if SNAPSHOT_MODE == "shared" and not SHARED:
+        print("⚠️ Shared snapshot mode needs flock and TECHNICAL_SNAPSHOT_DIR; running standalone")
+    async with upstream_client():
+        if SHARED and not LEADER_LOCK.acquire():
+            ROLE = "follower"
+            await load_saved_snapshot()
+            task = asyncio.create_task(follow_snapshots())
+        else:
+            ROLE = "leader" if SHARED else "standalone"
+            task = await start_refresher()
+        print(f"🧭 Technical service role: {ROLE}")
+        try:
+            yield
+        finally:
+            task.cancel()
+            if LEADER_LOCK:
+                LEADER_LOCK.release()
+
+app = FastAPI(title="NEPSE Technical Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,153 +60,268 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Global Cache
-CACHE = {
-    "raw": pd.DataFrame(),
-    "rsi": pd.DataFrame(),
-    "ma": pd.DataFrame(),
-    "crossover": pd.DataFrame(),
-    "candlestick": pd.DataFrame(),
-    "momentum": pd.DataFrame(),
-    "volume_shocker": pd.DataFrame(),
-    "last_updated": None
+instrument(app)
+
+# Current snapshot; replaced as a whole by each refresh, never mutated
+SNAPSHOT = Snapshot()
+REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="technical-refresh")
+_refresh_task = None
+_refresh_flags = {"full": False, "verify": False}   # of the running refresh
+_queued_refresh = None   # (flags, task) of a stronger refresh waiting for the running one
+
+# Multi-worker mode (see coordination.py): one leader refreshes, followers map its snapshots
+SHARED = SNAPSHOT_MODE == "shared" and SHARED_AVAILABLE and bool(SNAPSHOT_DIR)
+LEADER_LOCK = LeaderLock(SNAPSHOT_DIR) if SHARED else None
+ROLE = "standalone"
+_loaded_dir = None
+
+# Seconds between scheduled refreshes in each market phase (see shared.market_hours)
+REFRESH_INTERVALS = {
+    "open": int(os.environ.get("TECHNICAL_REFRESH_OPEN", 600)),
+    "post_close": int(os.environ.get("TECHNICAL_REFRESH_POST_CLOSE", 300)),
+    "closed": int(os.environ.get("TECHNICAL_REFRESH_CLOSED", 6 * 3600)),
 }
-
-async def load_technical_data():
+LAST_REFRESH = None      # report of the last refresh attempt
+NEXT_REFRESH_AT = None
+
+REFRESHES = counter("nepsehub_technical_refreshes_total", "Technical refreshes by outcome", ("status",))
+REFRESH_DURATION = histogram("nepsehub_technical_refresh_duration_seconds", "Technical refresh wall time")
+REFRESH_STAGE = histogram("nepsehub_technical_refresh_stage_seconds",
+                          "Technical refresh time per stage (fetch, parse, compute, index, publish)", ("stage",))
+gauge("nepsehub_technical_rows", "History rows in the current snapshot", function=lambda: len(SNAPSHOT.history))
+gauge("nepsehub_technical_symbols", "Symbols in the current snapshot",
+      function=lambda: len(SNAPSHOT.offsets[0]) if SNAPSHOT.ready else 0)
+gauge("nepsehub_technical_generation", "Generation of the current snapshot", function=lambda: SNAPSHOT.generation)
+gauge("nepsehub_technical_snapshot_age_seconds", "Seconds since the current snapshot was built",
+      function=lambda: time.time() - SNAPSHOT.last_updated if SNAPSHOT.last_updated else None)
+
+def _conditional_headers():
+    # Validators of the download the published snapshot was built from
+    if not SNAPSHOT.ready:
+        return {}
+    validators = SNAPSHOT.sheet_validators
+    headers = {}
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last-modified" in validators:
+        headers["If-Modified-Since"] = validators["last-modified"]
+    return headers
+
+async def _update(full, verify):
+    """Downloads the sheet and publishes a new snapshot unless it is unchanged; returns the report."""
+    global SNAPSHOT
+    force = full or verify
+    with tempfile.TemporaryFile(suffix=".csv") as sheet:
+        digest = hashlib.blake2b(digest_size=16)
+        started = time.perf_counter()
+        resp = await UPSTREAM.download(
+            GOOGLE_SHEET_CSV, sheet, hasher=digest,
+            headers={} if force else _conditional_headers(), follow_redirects=True
+        )
+        stages = {"fetch": round(time.perf_counter() - started, 3)}
+        if resp.status_code == 304:
+            return {"status": "unchanged", "reason": "not_modified", "stages": stages}
+        if resp.status_code != 200:
+            return {"status": "failed", "reason": f"HTTP {resp.status_code}", "stages": stages}
+
+        validators = {k: resp.headers[k] for k in ("etag", "last-modified") if k in resp.headers}
+        sheet_hash = digest.hexdigest()
+        if not force and SNAPSHOT.ready and sheet_hash == SNAPSHOT.sheet_hash:
+            # Same content as published: only its validators are new
+            SNAPSHOT = replace(SNAPSHOT, sheet_validators=MappingProxyType(validators))
+            return {"status": "unchanged", "reason": "same_content", "stages": stages}
+
+        sheet.seek(0)
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(
+            REFRESH_EXECUTOR, build_snapshot, SNAPSHOT, sheet, full, verify, sheet_hash, validators
+        )
+    if snapshot is None:
+        return {"status": "failed", "reason": "unusable sheet", "stages": stages}
+    started = time.perf_counter()
+    SNAPSHOT = snapshot
+    await persist_snapshot(snapshot)
+    stats = dict(snapshot.refresh)
+    stages.update(stats.pop("stages", {}), publish=round(time.perf_counter() - started, 3))
+    return {"status": stats.pop("mode"), "compute_duration": stats.pop("duration"), **stats, "stages": stages}
+
+async def _refresh(full, verify):
+    global LAST_REFRESH
+    started = time.time()
     try:
         print("🔄 Fetching Technical data from Google Sheets...")
-        async with httpx.AsyncClient(timeout=60, follow_redirects=True) as client:
-            resp = await client.get(GOOGLE_SHEET_CSV)
-
-        if resp.status_code != 200:
-            return
-
-        df = pd.read_csv(StringIO(resp.text))
-        df.columns = df.columns.str.strip().str.lower()
-        
-        required = {"date", "symbol", "open", "high", "low", "close", "volume"}
-        if not required.issubset(df.columns):
-            return
-
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        for col in ["open", "high", "low", "close", "volume"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-        
-        df = df.dropna(subset=["date", "symbol", "close"])
-        df = df.sort_values(["symbol", "date"])
-        CACHE["raw"] = df.copy()
-
-        rsi_list, ma_list, cross_list, candle_list, momentum_list = [], [], [], [], []
-        volume_shocker_list = []
-
-        for symbol, g in df.groupby("symbol"):
-            symbol_str = str(symbol).upper()
-            if any(char.isdigit() for char in symbol_str): continue
-            g = g.copy()
-            if len(g) < 2: continue
-            
-            g["rsi"] = calculate_rsi(g["close"], RSI_PERIOD)
-            g["ma20"] = calculate_ma(g["close"], MA_PERIOD)
-            g["sma50"] = calculate_ma(g["close"], MA_50)
-            g["sma200"] = calculate_ma(g["close"], MA_200)
-            g["vol_avg20"] = calculate_ma(g["volume"], 20)
-            
-            last = g.iloc[-1]
-            prev = g.iloc[-2]
-            
-            if not pd.isna(last["rsi"]):
-                rsi_list.append({"symbol": symbol_str, "close": float(last["close"]), "rsi": round(float(last["rsi"]), 2)})
-
-            ma_dist_pct = 0
-            if not pd.isna(last["ma20"]):
-                ma_dist_pct = (last["close"] - last["ma20"]) / last["ma20"] * 100
-                ma_list.append({
-                    "symbol": symbol_str, "close": float(last["close"]),
-                    "ma": round(float(last["ma20"]), 2), "percent_diff": round(float(ma_dist_pct), 2)
-                })
-
-            if len(g) >= MA_200 and not pd.isna(last["sma200"]):
-                signal = "Golden Cross" if (prev["sma50"] <= prev["sma200"] and last["sma50"] > last["sma200"]) else \
-                         "Death Cross" if (prev["sma50"] >= prev["sma200"] and last["sma50"] < last["sma200"]) else \
-                         "Bullish Alignment" if last["sma50"] > last["sma200"] else "Bearish Alignment"
-                cross_list.append({
-                    "symbol": symbol_str, "close": float(last["close"]),
-                    "sma50": round(float(last["sma50"]), 2), "sma200": round(float(last["sma200"]), 2),
-                    "signal": signal, "is_cross": ("Cross" in signal)
-                })
-
-            pattern = detect_candlestick(g)
-            if pattern != "Neutral":
-                candle_list.append({"symbol": symbol_str, "close": float(last["close"]), "pattern": pattern})
-
-
-            v_avg = last["vol_avg20"] if not pd.isna(last["vol_avg20"]) else 0
-            vol_ratio = last["volume"] / v_avg if v_avg > 0 else 0
-            win_52 = g.tail(250)
-            h52 = win_52["high"].max()
-            l52 = win_52["low"].min()
-            rs_score = (last["close"] / g.iloc[-250]["close"] * 100) if len(g) >= 250 else 0
-
-            momentum_list.append({
-                "symbol": symbol_str, "close": float(last["close"]), "vol_ratio": round(float(vol_ratio), 2),
-                "high_52": float(h52), "low_52": float(l52), "rs_score": round(float(rs_score), 2),
-                "breakout": "High" if last["close"] >= h52 else "Low" if last["close"] <= l52 else "Neutral"
-            })
-
-            shock_level, shock_ratio = detect_volume_shocker(g, last["vol_avg20"])
-            if shock_level != "Normal":
-                volume_shocker_list.append({
-                    "symbol": symbol_str, "close": float(last["close"]), "volume": float(last["volume"]),
-                    "vol_avg_20": round(float(last["vol_avg20"]), 0), "vol_ratio": shock_ratio,
-                    "shock_level": shock_level
-                })
-
-        CACHE["rsi"] = pd.DataFrame(rsi_list)
-        CACHE["ma"] = pd.DataFrame(ma_list)
-        CACHE["crossover"] = pd.DataFrame(cross_list)
-        CACHE["candlestick"] = pd.DataFrame(candle_list)
-        CACHE["momentum"] = pd.DataFrame(momentum_list)
-        CACHE["volume_shocker"] = pd.DataFrame(volume_shocker_list)
-        CACHE["last_updated"] = time.time()
-        print("✅ Technical Data Updated")
+        report = await _update(full, verify)
     except Exception as e:
         print(f"❌ Load Error: {e}")
+        report = {"status": "failed", "reason": str(e)}
+    report.update(duration=round(time.time() - started, 3), at=time.time(), generation=SNAPSHOT.generation)
+    LAST_REFRESH = report
+    REFRESHES.inc(status=report["status"])
+    REFRESH_DURATION.observe(report["duration"])
+    for stage, seconds in report.get("stages", {}).items():
+        REFRESH_STAGE.observe(seconds, stage=stage)
+    if report["status"] == "failed":
+        print(f"❌ Technical refresh failed: {report['reason']}")
+        return None
+    if report["status"] == "unchanged":
+        print(f"⏭️ Technical sheet unchanged ({report['reason']}, {report['duration']}s)")
+    else:
+        print(f"✅ Technical Data Updated (generation {report['generation']}, "
+              f"{report['status']}, {report['duration']}s)")
+    return report
+
+async def load_saved_snapshot():
+    """Publishes the snapshot saved by an earlier run (or by the leader), if there is a usable one."""
+    global SNAPSHOT, _loaded_dir
+    path = current_generation_dir()
+    try:
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(REFRESH_EXECUTOR, load_snapshot)
+    except Exception as e:
+        print(f"⚠️ Saved snapshot unreadable: {e}")
+        return False
+    if snapshot is None:
+        return False
+    SNAPSHOT, _loaded_dir = snapshot, path
+    if ROLE == "follower":
+        await loop.run_in_executor(REFRESH_EXECUTOR, trim_heap)
+    print(f"💾 Loaded saved technical snapshot (generation {snapshot.generation})")
+    return True
+
+async def persist_snapshot(snapshot):
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(REFRESH_EXECUTOR, save_snapshot, snapshot)
+    except Exception as e:
+        print(f"⚠️ Could not save technical snapshot: {e}")
+
+async def load_technical_data(full=False, verify=False):
+    """
+    Refreshes the technical snapshot. Only symbols whose rows changed since the
+    last load are recomputed unless `full` is set; `verify` additionally
+    checks the incremental result against a full recompute.
+    Calls made while a refresh is running join that refresh when it already
+    does what they ask for; otherwise (e.g. full=true during a scheduled
+    incremental refresh) they share one refresh queued behind it, with the
+    flags of every call merged, and get that refresh's report.
+    """
+    global _refresh_task, _refresh_flags, _queued_refresh
+    running = _refresh_task is not None and not _refresh_task.done()
+    if running and (_refresh_flags["full"] or not full) and (_refresh_flags["verify"] or not verify):
+        return await asyncio.shield(_refresh_task)
+    if _queued_refresh is not None:
+        flags, task = _queued_refresh
+        flags["full"] |= full
+        flags["verify"] |= verify
+        return await asyncio.shield(task)
+    flags = {"full": full, "verify": verify}
+    if running:
+        task = asyncio.create_task(_refresh_after(_refresh_task, flags))
+        _queued_refresh = (flags, task)
+    else:
+        task = _refresh_task = asyncio.create_task(_refresh(full, verify))
+        _refresh_flags = flags
+    return await asyncio.shield(task)
+
+async def _refresh_after(previous, flags):
+    global _refresh_task, _refresh_flags, _queued_refresh
+    await asyncio.wait([previous])
+    _refresh_task, _refresh_flags, _queued_refresh = asyncio.current_task(), flags, None
+    return await _refresh(**flags)
+
+def refresh_delay(now=None):
+    """
+    Seconds until the next scheduled refresh: the interval of the current
+    market phase, cut short so a refresh also runs at every phase change
+    (open, close, end of the post-close window).
+    """
+    now = now or nepal_now()
+    until_change = (next_phase_change(now) - now).total_seconds()
+    return max(1.0, min(REFRESH_INTERVALS[market_phase(now)], until_change))
 
 async def auto_refresh():
+    global NEXT_REFRESH_AT
     while True:
-        await asyncio.sleep(600) # Refresh every 10 mins as requested
+        NEXT_REFRESH_AT = time.time() + refresh_delay()
+        while time.time() < NEXT_REFRESH_AT:
+            # A leader also wakes up for refreshes requested by followers
+            await asyncio.sleep(max(0, min(FOLLOW_INTERVAL if SHARED else 1e9, NEXT_REFRESH_AT - time.time())))
+            request = take_refresh_request(SNAPSHOT_DIR) if SHARED else None
+            if request:
+                await load_technical_data(**request)
         await load_technical_data()
 
-@app.on_event("startup")
-async def startup():
-    await load_technical_data()
-    asyncio.create_task(auto_refresh())
+async def start_refresher():
+    """Loads the saved snapshot, refreshes from the sheet and starts the schedule."""
+    if await load_saved_snapshot():
+        # Serve the saved snapshot right away; reconcile with the sheet behind it
+        asyncio.create_task(load_technical_data())
+    else:
+        await load_technical_data()
+    return asyncio.create_task(auto_refresh())
 
+async def follow_snapshots():
+    """Follower loop: maps each new generation the leader publishes, takes over if it goes away."""
+    global ROLE
+    while True:
+        await asyncio.sleep(FOLLOW_INTERVAL)
+        if LEADER_LOCK.acquire():
+            ROLE = "leader"
+            print("👑 Technical leader gone; taking over refreshes")
+            await load_technical_data()
+            await auto_refresh()
+        if current_generation_dir() != _loaded_dir:
+            await load_saved_snapshot()
+
+# List endpoints serve the payloads pre-rendered with the snapshot
 @app.get("/rsi/all")
-def rsi_all():
-    return CACHE["rsi"].to_dict(orient="records")
+def rsi_all(request: Request):
+    return serve_payload(request, SNAPSHOT.payloads["rsi"])
 
 @app.get("/ma/all")
-def ma_all():
-    return CACHE["ma"].to_dict(orient="records")
+def ma_all(request: Request):
+    return serve_payload(request, SNAPSHOT.payloads["ma"])
 
 @app.get("/momentum/all")
-def momentum_all():
-    return CACHE["momentum"].to_dict(orient="records")
+def momentum_all(request: Request):
+    return serve_payload(request, SNAPSHOT.payloads["momentum"])
 
 
 @app.get("/crossovers/all")
-def crossovers_all():
-    return CACHE["crossover"].to_dict(orient="records")
+def crossovers_all(request: Request):
+    return serve_payload(request, SNAPSHOT.payloads["crossover"])
 
 @app.get("/candlesticks/all")
-def candlesticks_all():
-    return CACHE["candlestick"].to_dict(orient="records")
+def candlesticks_all(request: Request):
+    return serve_payload(request, SNAPSHOT.payloads["candlestick"])
 
 @app.get("/volume-shockers/all")
-def volume_shockers_all():
-    return CACHE["volume_shocker"].sort_values("vol_ratio", ascending=False).to_dict(orient="records")
+def volume_shockers_all(request: Request):
+    return serve_payload(request, SNAPSHOT.payloads["volume_shocker"])
+
+def _screen(where=None, sort=None, limit=None, fields=None, clauses=()):
+    screener = SNAPSHOT.screener
+    try:
+        ids = screener.select(where=where, sort=sort, limit=limit, clauses=clauses)
+        body = screener.render(ids, fields)
+    except ScreenerError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(body, media_type="application/json")
+
+@app.get("/screener")
+def screener(
+    where: str = None,
+    sort: str = None,
+    limit: int = Query(None, ge=1),
+    fields: str = None
+):
+    """
+    Combined filter over the rsi, ma, momentum, crossover, candlestick and
+    volume shocker values of every symbol.
+    Example: /screener?where=rsi<30 AND percent_diff<-5 AND signal=Golden Cross&sort=-rs_score&limit=20&fields=symbol,close,rsi
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return _screen(where=where, sort=sort, limit=limit, fields=field_list)
 
 @app.get("/volume-shockers/filter")
 def volume_shockers_filter(level: str = None):
@@ -182,36 +329,133 @@ def volume_shockers_filter(level: str = None):
     Filter volume shockers by shock level: Extreme, High, Moderate
     Example: /volume-shockers/filter?level=Extreme
     """
-    df = CACHE["volume_shocker"].copy()
     if level and level in ["Extreme", "High", "Moderate"]:
-        df = df[df["shock_level"] == level]
-    return df.sort_values("vol_ratio", ascending=False).to_dict(orient="records")
+        clauses = [("shock_level", "=", level)]
+    else:
+        clauses = [("shock_level", "!=", "Normal")]
+    return _screen(sort="-vol_ratio", clauses=clauses,
+                   fields=["symbol", "close", "volume", "vol_avg_20", "vol_ratio", "shock_level"])
 
 @app.get("/rsi/filter")
 def rsi_filter(min: float = None, max: float = None):
-    df = CACHE["rsi"].copy()
-    if min is not None: df = df[df["rsi"] >= min]
-    if max is not None: df = df[df["rsi"] <= max]
-    return df.sort_values("rsi").to_dict(orient="records")
+    clauses = [("rsi", ">=", min if min is not None else "-inf")]
+    if max is not None: clauses.append(("rsi", "<=", max))
+    return _screen(sort="rsi", clauses=clauses, fields=["symbol", "close", "rsi"])
+
+def _freshness(snap):
+    return {
+        "generation": snap.generation, "last_updated": snap.last_updated,
+        "age": round(time.time() - snap.last_updated, 1) if snap.last_updated else None,
+        "source": snap.source, "schema_version": SCHEMA_VERSION,
+    }
+
+def _events(group, days, symbol, pattern):
+    events = SNAPSHOT.events
+    try:
+        ids = events.select(group, days=days, symbol=symbol, pattern=pattern)
+    except EventError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(events.render(ids, crosses=group is CROSS_EVENTS), media_type="application/json")
+
+@app.get("/candlesticks/history")
+def candlesticks_history(days: int = Query(DEFAULT_DAYS, ge=1), symbol: str = None, pattern: str = None):
+    """
+    Candlestick patterns found in the last `days` sessions, newest first.
+    Example: /candlesticks/history?days=30&pattern=Bullish Engulfing
+    """
+    return _events(CANDLE_EVENTS, days, symbol, pattern)
+
+@app.get("/crossovers/history")
+def crossovers_history(days: int = Query(DEFAULT_DAYS, ge=1), symbol: str = None, pattern: str = None):
+    """
+    Golden / Death Crosses of SMA50 and SMA200 in the last `days` sessions.
+    Example: /crossovers/history?days=60&pattern=Golden Cross
+    """
+    return _events(CROSS_EVENTS, days, symbol, pattern)
+
+def _status(table, count_key):
+    snap = SNAPSHOT
+    df = snap.tables[table]
+    return {"status": "ready" if not df.empty else "not_ready", count_key: len(df), **_freshness(snap)}
+
+@app.get("/technical/status")
+def technical_status():
+    """Snapshot freshness; source is "disk" until the first refresh after startup completes."""
+    snap = SNAPSHOT
+    return {
+        "status": "ready" if snap.ready else "not_ready", **_freshness(snap),
+        "role": ROLE, "leader_pid": LEADER_LOCK.leader_pid() if LEADER_LOCK else None,
+        "refresh": dict(snap.refresh) if snap.refresh else None,
+        "last_refresh": LAST_REFRESH,
+        "market_phase": market_phase(),
+        "next_refresh_in": round(NEXT_REFRESH_AT - time.time(), 1) if NEXT_REFRESH_AT else None,
+    }
 
 @app.get("/rsi/status")
 def rsi_status():
-    return {"status": "ready" if not CACHE["rsi"].empty else "not_ready", "symbols": len(CACHE["rsi"])}
+    return _status("rsi", "symbols")
 
 @app.get("/ma/status")
 def ma_status():
-    return {"status": "ready" if not CACHE["ma"].empty else "not_ready", "symbols": len(CACHE["ma"])}
+    return _status("ma", "symbols")
 
 @app.get("/volume-shockers/status")
 def volume_shockers_status():
-    return {"status": "ready" if not CACHE["volume_shocker"].empty else "not_ready", "shockers": len(CACHE["volume_shocker"])}
+    return _status("volume_shocker", "shockers")
+
+@app.get("/technical/{symbol}")
+def technical_series(
+    request: Request,
+    symbol: str,
+    fields: str = None,
+    date_from: str = Query(None, alias="from"),
+    date_to: str = Query(None, alias="to")
+):
+    """
+    Daily OHLCV and rsi/ma20/sma50/sma200/vol_avg20 series of one symbol.
+    Example: /technical/NABIL?from=2024-01-01&to=2024-06-30&fields=close,rsi
+    """
+    series = SNAPSHOT.series
+    if symbol not in series:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol: {symbol}")
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        payload = series.payload(symbol, field_list, date_from, date_to)
+    except SeriesError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serve_payload(request, payload)
 
 @app.get("/refresh-technical")
-async def refresh():
-    await load_technical_data()
-    return {"status": "success"}
+async def refresh(full: bool = False, verify: bool = False):
+    """
+    Example: /refresh-technical?full=true forces a full rebuild,
+    /refresh-technical?verify=true compares the incremental update with one.
+    """
+    if ROLE == "follower":
+        request_refresh(SNAPSHOT_DIR, full=full, verify=verify)
+        return {"status": "queued", "role": ROLE, "leader_pid": LEADER_LOCK.leader_pid()}
+    report = await load_technical_data(full=full, verify=verify)
+    return {"status": "success" if report else "failed", "refresh": report or LAST_REFRESH}
+
+@app.get("/debug/profile/refresh")
+async def profile_refresh(
+    full: bool = True,
+    interval: float = Query(0.002, ge=0.001, le=1),
+    format: str = Query("json", regex="^(json|collapsed)$")
+):
+    """
+    CPU profile of one refresh, sampling the event loop and the refresh
+    thread (needs METRICS_PROFILER=1). full=true by default so an unchanged
+    sheet still runs the whole pipeline. format=collapsed returns folded stacks.
+    """
+    if ROLE == "follower":
+        raise HTTPException(status_code=409, detail="Followers do not refresh; profile the leader")
+    loop = asyncio.get_running_loop()
+    threads = {threading.get_ident(), await loop.run_in_executor(REFRESH_EXECUTOR, threading.get_ident)}
+    with profiling(interval, threads) as profiler:
+        report = await load_technical_data(full=full)
+    return profile_response(profiler, format, refresh=report)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8002))
     uvicorn.run("main:app", host="0.0.0.0", port=port)
-import time
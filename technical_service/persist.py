@@ -0,0 +1,194 @@
+"""
+On-disk technical snapshots.
+
+Each saved generation is a directory of plain .npy files (one per column,
+memory-mappable) plus meta.json:
+
+    <root>/CURRENT                     name of the latest complete generation
+    <root>/gen-<generation>-<stamp>/
+        meta.json                      schema version, freshness, columns
+        history.<column>.npy           indicator history, symbol as int32 codes
+        symbols.npy                    symbol names (also offsets order)
+        offsets.starts.npy / .ends.npy
+        table.<name>.<column>.npy      computed tables
+
+A generation is written into a temporary directory and published by renaming
+it and then atomically replacing CURRENT, so readers never see a partial one.
+Temporary names carry the writer's pid: several standalone workers may save
+into the same directory, and a prune only removes another process's
+temporary directory once it is older than STALE_TMP_SECONDS (left behind by
+a crashed writer).
+"""
+import json
+import os
+import shutil
+import time
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from technical_service.engine import TABLES, TABLE_COLUMNS, latest_frame
+from technical_service.screener import Screener
+from technical_service.events import EventIndex
+from technical_service.series import SeriesIndex
+from technical_service.snapshot import Snapshot, render_payloads
+
+SCHEMA_VERSION = 2
+KEEP_GENERATIONS = 2
+STALE_TMP_SECONDS = 3600
+SNAPSHOT_DIR = os.environ.get(
+    "TECHNICAL_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+
+
+def _save_column(path, values):
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(str)
+    np.save(path, values, allow_pickle=False)
+
+
+def save_snapshot(snapshot, root=SNAPSHOT_DIR):
+    """Writes `snapshot` as a new generation under `root`; returns its directory."""
+    if not root or not snapshot.ready:
+        return None
+    os.makedirs(root, exist_ok=True)
+    name = f"gen-{snapshot.generation:06d}-{int(time.time() * 1000)}"
+    tmp = os.path.join(root, f".{name}.{os.getpid()}.tmp")
+    os.makedirs(tmp)
+
+    hist = snapshot.history
+    names, starts, ends = snapshot.offsets
+    history_columns = [c for c in hist.columns if c != "symbol"]
+    for column in history_columns:
+        values = hist[column].to_numpy()
+        if column == "date":
+            values = values.astype("datetime64[ns]")
+        _save_column(os.path.join(tmp, f"history.{column}.npy"), values)
+    codes = np.repeat(np.arange(len(names), dtype=np.int32), ends - starts)
+    _save_column(os.path.join(tmp, "history.symbol_code.npy"), codes)
+    _save_column(os.path.join(tmp, "symbols.npy"), np.asarray(names, dtype=str))
+    _save_column(os.path.join(tmp, "offsets.starts.npy"), starts.astype(np.int64))
+    _save_column(os.path.join(tmp, "offsets.ends.npy"), ends.astype(np.int64))
+
+    for table in TABLES:
+        df = snapshot.tables[table]
+        for column in TABLE_COLUMNS[table]:
+            _save_column(os.path.join(tmp, f"table.{table}.{column}.npy"), df[column].to_numpy())
+
+    meta = {
+        "schema_version": SCHEMA_VERSION,
+        "generation": snapshot.generation,
+        "last_updated": snapshot.last_updated,
+        "saved_at": time.time(),
+        "rows": int(len(hist)),
+        "symbols": int(len(names)),
+        "history_columns": history_columns,
+        "refresh": dict(snapshot.refresh or {}),
+        "sheet_hash": snapshot.sheet_hash,
+        "sheet_validators": dict(snapshot.sheet_validators),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, default=str)
+
+    final = os.path.join(root, name)
+    os.rename(tmp, final)
+    pointer = os.path.join(root, f".CURRENT.{os.getpid()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, "CURRENT"))
+    _prune(root, keep=name)
+    return final
+
+
+def _stale_tmp(root, name, now):
+    """True for a temporary generation directory of this process, or an abandoned one."""
+    if not (name.startswith(".gen-") and name.endswith(".tmp")):
+        return False
+    if name.endswith(f".{os.getpid()}.tmp"):
+        return True
+    try:
+        return now - os.path.getmtime(os.path.join(root, name)) > STALE_TMP_SECONDS
+    except OSError:
+        return False
+
+
+def _prune(root, keep):
+    def mtime(d):
+        try:
+            return os.path.getmtime(os.path.join(root, d))
+        except OSError:  # pruned by another worker meanwhile
+            return 0
+    now = time.time()
+    names = os.listdir(root)
+    others = sorted((d for d in names if d.startswith("gen-") and d != keep), key=mtime, reverse=True)
+    leftovers = [d for d in names if _stale_tmp(root, d, now)]
+    for d in others[KEEP_GENERATIONS - 1:] + leftovers:
+        shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+
+def current_generation_dir(root=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            name = f.read().strip()
+    except (OSError, TypeError):
+        return None
+    path = os.path.join(root, name)
+    return path if name and os.path.isdir(path) else None
+
+
+def read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def load_snapshot(root=SNAPSHOT_DIR, mmap=True):
+    """
+    Loads the current generation under `root` as a Snapshot (source "disk"),
+    or returns None when there is none or its schema version differs.
+    """
+    path = current_generation_dir(root) if root else None
+    if path is None:
+        return None
+    meta = read_meta(path)
+    if meta.get("schema_version") != SCHEMA_VERSION:
+        return None
+
+    mode = "r" if mmap else None
+    load = lambda name: np.load(os.path.join(path, name), mmap_mode=mode, allow_pickle=False)
+    names = load("symbols.npy")
+    starts, ends = load("offsets.starts.npy"), load("offsets.ends.npy")
+    offsets = (np.asarray(names, dtype=object), np.asarray(starts), np.asarray(ends))
+
+    history = {"date": load("history.date.npy")}
+    history["symbol"] = pd.Categorical.from_codes(load("history.symbol_code.npy"), categories=offsets[0])
+    for column in meta["history_columns"]:
+        if column != "date":
+            history[column] = load(f"history.{column}.npy")
+    hist = pd.DataFrame(history, copy=False)
+
+    tables = {}
+    for table in TABLES:
+        tables[table] = pd.DataFrame(
+            {c: np.asarray(load(f"table.{table}.{c}.npy")) for c in TABLE_COLUMNS[table]},
+            columns=TABLE_COLUMNS[table],
+        )
+
+    latest = latest_frame(hist, offsets) if len(hist) else None
+    refresh = dict(meta.get("refresh") or {})
+    return Snapshot(
+        generation=meta["generation"],
+        last_updated=meta["last_updated"],
+        history=hist,
+        offsets=offsets,
+        tables=MappingProxyType(tables),
+        payloads=render_payloads(tables),
+        screener=Screener(tables, latest),
+        series=SeriesIndex(hist, offsets),
+        events=EventIndex(hist, offsets),
+        refresh=MappingProxyType(refresh),
+        source="disk",
+        sheet_hash=meta.get("sheet_hash"),
+        sheet_validators=MappingProxyType(dict(meta.get("sheet_validators") or {})),
+    )
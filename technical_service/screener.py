@@ -0,0 +1,170 @@
+"""
+Indexed screener over the technical tables.
+
+Each snapshot joins the rsi, ma, momentum, crossover, candlestick and volume
+shocker tables into one row per symbol and keeps, per column, a sorted index
+(numeric columns) or a value -> row ids map (text columns). Range predicates
+become two binary searches, equality predicates a dict lookup, and rows are
+pre-encoded so a query only concatenates bytes.
+"""
+import json
+import re
+
+import numpy as np
+
+NUMERIC_COLUMNS = [
+    "close", "rsi", "ma", "percent_diff", "sma50", "sma200", "vol_ratio",
+    "high_52", "low_52", "rs_score", "volume", "vol_avg_20",
+]
+TEXT_COLUMNS = ["symbol", "signal", "is_cross", "pattern", "breakout", "shock_level"]
+COLUMNS = ["symbol"] + NUMERIC_COLUMNS + TEXT_COLUMNS[1:]
+
+_CLAUSE = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$")
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+
+
+class ScreenerError(ValueError):
+    pass
+
+
+def _joined_table(tables, latest):
+    base = tables["momentum"][["symbol", "close", "vol_ratio", "high_52", "low_52", "rs_score", "breakout"]]
+    df = base.set_index("symbol")
+    df = df.join(tables["rsi"].set_index("symbol")[["rsi"]])
+    df = df.join(tables["ma"].set_index("symbol")[["ma", "percent_diff"]])
+    df = df.join(tables["crossover"].set_index("symbol")[["sma50", "sma200", "signal", "is_cross"]])
+    df = df.join(tables["candlestick"].set_index("symbol")[["pattern"]])
+    df = df.join(tables["volume_shocker"].set_index("symbol")[["shock_level"]])
+    df["pattern"] = df["pattern"].fillna("Neutral")
+    df["shock_level"] = df["shock_level"].fillna("Normal")
+    if latest is not None and len(latest):
+        extra = latest.set_index("symbol")
+        df["volume"] = extra["volume"]
+        df["vol_avg_20"] = extra["vol_avg20"].round(0)
+    else:
+        df["volume"] = np.nan
+        df["vol_avg_20"] = np.nan
+    return df.reset_index()[COLUMNS]
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return "true" if value else "false"
+    return str(value)
+
+
+class Screener:
+    def __init__(self, tables, latest=None):
+        df = _joined_table(tables, latest)
+        self.size = len(df)
+        self.numeric = {}
+        self.text = {}
+        self.rank = {}
+
+        for column in NUMERIC_COLUMNS:
+            values = df[column].to_numpy(dtype=np.float64)
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.argsort(values[valid], kind="stable")]
+            self.numeric[column] = (values[order], order)
+
+        for column in TEXT_COLUMNS:
+            groups = {}
+            for row, value in enumerate(df[column].to_numpy(dtype=object)):
+                key = _text(value)
+                if key is not None:
+                    groups.setdefault(key.lower(), []).append(row)
+            self.text[column] = {k: np.array(v, dtype=np.int64) for k, v in groups.items()}
+
+        for column in COLUMNS:
+            series = df[column]
+            self.rank[column] = (
+                series.rank(method="first", na_option="bottom").to_numpy(dtype=np.int64),
+                series.rank(method="first", ascending=False, na_option="bottom").to_numpy(dtype=np.int64),
+            )
+
+        records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+        self.records = records
+        self.encoded = [json.dumps(r, separators=(",", ":")).encode() for r in records]
+
+    def _match(self, column, op, raw):
+        if column in self.numeric:
+            try:
+                value = float(raw)
+            except ValueError:
+                raise ScreenerError(f"'{column}' expects a number, got '{raw}'")
+            values, order = self.numeric[column]
+            if op == "<":
+                return order[:np.searchsorted(values, value, "left")]
+            if op == "<=":
+                return order[:np.searchsorted(values, value, "right")]
+            if op == ">":
+                return order[np.searchsorted(values, value, "right"):]
+            if op == ">=":
+                return order[np.searchsorted(values, value, "left"):]
+            lo, hi = np.searchsorted(values, value, "left"), np.searchsorted(values, value, "right")
+            if op == "=":
+                return order[lo:hi]
+            return np.concatenate([order[:lo], order[hi:]])
+
+        if column in self.text:
+            groups = self.text[column]
+            if op == "=":
+                return groups.get(raw.lower(), np.empty(0, dtype=np.int64))
+            if op == "!=":
+                rest = [ids for key, ids in groups.items() if key != raw.lower()]
+                return np.concatenate(rest) if rest else np.empty(0, dtype=np.int64)
+            raise ScreenerError(f"'{column}' only supports = and !=")
+
+        raise ScreenerError(f"Unknown column '{column}'")
+
+    def select(self, where=None, sort=None, limit=None, clauses=()):
+        """
+        Returns the matching row ids. `where` is a conjunction such as
+        "rsi<30 AND signal=Golden Cross"; `clauses` are (column, op, value)
+        triples applied as well. `sort` is a column name, "-" prefix for descending.
+        """
+        parsed = list(clauses)
+        if where:
+            for part in _AND.split(where.strip()):
+                m = _CLAUSE.match(part)
+                if not m:
+                    raise ScreenerError(f"Cannot parse filter '{part}'")
+                parsed.append(m.groups())
+
+        candidates = [self._match(column.lower(), op, value) for column, op, value in parsed]
+        if candidates:
+            candidates.sort(key=len)
+            ids = candidates[0]
+            for other in candidates[1:]:
+                if len(ids) == 0:
+                    break
+                member = np.zeros(self.size, dtype=bool)
+                member[other] = True
+                ids = ids[member[ids]]
+            ids = np.sort(ids)
+        else:
+            ids = np.arange(self.size)
+
+        if sort:
+            descending = sort.startswith("-")
+            column = sort.lstrip("+-").lower()
+            if column not in self.rank:
+                raise ScreenerError(f"Unknown sort column '{column}'")
+            rank = self.rank[column][1 if descending else 0]
+            ids = ids[np.argsort(rank[ids], kind="stable")]
+
+        if limit is not None:
+            ids = ids[:limit]
+        return ids
+
+    def render(self, ids, fields=None):
+        """Encodes the selected rows, optionally restricted to `fields`."""
+        if not fields:
+            return b"[" + b",".join(self.encoded[i] for i in ids) + b"]"
+        unknown = [f for f in fields if f not in COLUMNS]
+        if unknown:
+            raise ScreenerError(f"Unknown field(s): {', '.join(unknown)}")
+        rows = [{f: self.records[i][f] for f in fields} for i in ids]
+        return json.dumps(rows, separators=(",", ":")).encode()
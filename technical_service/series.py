@@ -0,0 +1,99 @@
+"""
+Per-symbol indicator series.
+
+The snapshot history is sorted by (symbol, date), so every symbol owns one
+contiguous slice [start, end) of each column. SeriesIndex maps a symbol to
+that slice and narrows it to a date range with two binary searches on the
+date column; a request never scans other symbols' rows. Encoded responses
+are kept in a small LRU cache that lives and dies with the snapshot.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from shared.payloads import Payload
+from technical_service.engine import PRICE_COLUMNS, INDICATOR_COLUMNS, float_values
+
+SERIES_FIELDS = ["date"] + PRICE_COLUMNS + INDICATOR_COLUMNS
+SERIES_CACHE_SIZE = 256
+
+
+class SeriesError(ValueError):
+    pass
+
+
+def _date(value, name):
+    if value is None:
+        return None
+    try:
+        return np.datetime64(pd.Timestamp(value).to_datetime64())
+    except (ValueError, TypeError):
+        raise SeriesError(f"Invalid {name} date: {value}")
+
+
+class SeriesIndex:
+    def __init__(self, history=None, offsets=None, cache_size=SERIES_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if offsets is None:
+            self.symbols, self.starts, self.ends, self.columns = {}, None, None, {}
+            return
+        names, self.starts, self.ends = offsets
+        self.symbols = {str(name).upper(): i for i, name in enumerate(names)}
+        self.columns = {name: history[name] for name in SERIES_FIELDS}
+        self.dates = history["date"].to_numpy()
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self.symbols
+
+    def bounds(self, symbol, date_from=None, date_to=None):
+        """Row range [start, end) of `symbol` between the two dates (inclusive)."""
+        i = self.symbols[symbol.upper()]
+        start, end = int(self.starts[i]), int(self.ends[i])
+        dates = self.dates[start:end]
+        lo = start + (np.searchsorted(dates, date_from, side="left") if date_from is not None else 0)
+        hi = start + (np.searchsorted(dates, date_to, side="right") if date_to is not None else end - start)
+        return int(lo), int(max(lo, hi))
+
+    def _encode(self, symbol, fields, lo, hi):
+        data = {}
+        for name in fields:
+            if name == "date":
+                data[name] = np.datetime_as_string(self.dates[lo:hi], unit="D")
+            elif name in PRICE_COLUMNS:
+                data[name] = float_values(self.columns[name].iloc[lo:hi])
+            else:
+                data[name] = np.round(self.columns[name].to_numpy()[lo:hi], 2)
+        records = pd.DataFrame(data, columns=fields).to_json(orient="records")
+        body = f'{{"symbol":"{symbol}","count":{hi - lo},"data":'.encode() + records.encode() + b"}"
+        return Payload.from_bytes(body)
+
+    def payload(self, symbol, fields=None, date_from=None, date_to=None):
+        """
+        Encoded series of `symbol` as a Payload. Raises KeyError for an unknown
+        symbol and SeriesError for bad fields or dates.
+        """
+        symbol = symbol.upper()
+        fields = list(fields) if fields else SERIES_FIELDS
+        unknown = [f for f in fields if f not in SERIES_FIELDS]
+        if unknown:
+            raise SeriesError(f"Unknown fields: {', '.join(unknown)}")
+        if "date" not in fields:
+            fields = ["date"] + fields
+        lo, hi = self.bounds(symbol, _date(date_from, "from"), _date(date_to, "to"))
+
+        key = (symbol, tuple(fields), lo, hi)
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is not None:
+                self._cache.move_to_end(key)
+                return payload
+        payload = self._encode(symbol, fields, lo, hi)
+        with self._lock:
+            self._cache[key] = payload
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return payload
@@ -0,0 +1,107 @@
+"""
+Immutable technical snapshot.
+
+A refresh builds a complete Snapshot off the event loop and the service
+publishes it with a single reference swap, so a request always reads the
+tables of exactly one generation. Nothing in a published snapshot is mutated.
+"""
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from types import MappingProxyType
+
+import pandas as pd
+
+from shared.payloads import Payload
+from technical_service.engine import read_sheet, latest_frame, build_tables, empty_tables, TABLES
+from technical_service.incremental import update_indicators, check_incremental
+from technical_service.events import EventIndex
+from technical_service.screener import Screener
+from technical_service.series import SeriesIndex
+
+# Tables served whole by the list endpoints, with their sort order
+LIST_SORT = {"volume_shocker": ("vol_ratio", False)}
+
+
+def render_payloads(tables):
+    """Encodes every list table once per snapshot."""
+    payloads = {}
+    for name in TABLES:
+        df = tables[name]
+        if name in LIST_SORT and not df.empty:
+            column, ascending = LIST_SORT[name]
+            df = df.sort_values(column, ascending=ascending)
+        payloads[name] = Payload.from_bytes(df.to_json(orient="records").encode())
+    return MappingProxyType(payloads)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    generation: int = 0
+    last_updated: float = None
+    history: pd.DataFrame = field(default_factory=pd.DataFrame)
+    offsets: tuple = None
+    tables: MappingProxyType = field(default_factory=lambda: MappingProxyType(empty_tables()))
+    payloads: MappingProxyType = field(default_factory=lambda: render_payloads(empty_tables()))
+    screener: Screener = field(default_factory=lambda: Screener(empty_tables()))
+    series: SeriesIndex = field(default_factory=SeriesIndex)
+    events: EventIndex = field(default_factory=EventIndex)
+    refresh: MappingProxyType = None
+    source: str = "sheet"
+    sheet_hash: str = None
+    sheet_validators: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    @property
+    def ready(self):
+        return self.offsets is not None
+
+
+def build_snapshot(prev, sheet, full=False, verify=False, sheet_hash=None, sheet_validators=None):
+    """
+    CPU side of a refresh: parse the sheet (a path, binary file or bytes),
+    update indicators and build the tables. Runs in a worker thread. Returns
+    None when the sheet is unusable. `sheet_hash` identifies the sheet
+    content so an identical download can be skipped next time, and
+    `sheet_validators` (ETag / Last-Modified of the download) let the next
+    download be conditional.
+    """
+    started = time.time()
+    df = read_sheet(BytesIO(sheet) if isinstance(sheet, bytes) else sheet)
+    if df is None:
+        return None
+    parsed = time.time()
+
+    state = None if full or not prev.ready else (prev.history, prev.offsets)
+    hist, offsets, stats = update_indicators(state, df)
+    if verify:
+        stats["consistency"] = check_incremental(state, df)
+    latest = latest_frame(hist, offsets) if len(hist) else None
+    tables = build_tables(latest) if latest is not None else empty_tables()
+    computed = time.time()
+
+    payloads = render_payloads(tables)
+    screener = Screener(tables, latest)
+    series = SeriesIndex(hist, offsets)
+    events = EventIndex(hist, offsets)
+    finished = time.time()
+    stats["duration"] = round(finished - started, 3)
+    stats["stages"] = {
+        "parse": round(parsed - started, 3),
+        "compute": round(computed - parsed, 3),
+        "index": round(finished - computed, 3),
+    }
+
+    return Snapshot(
+        generation=prev.generation + 1,
+        last_updated=finished,
+        history=hist,
+        offsets=offsets,
+        tables=MappingProxyType(tables),
+        payloads=payloads,
+        screener=screener,
+        series=series,
+        events=events,
+        refresh=MappingProxyType(stats),
+        sheet_hash=sheet_hash,
+        sheet_validators=MappingProxyType(dict(sheet_validators or {})),
+    )
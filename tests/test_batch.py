@@ -0,0 +1,54 @@
+"""
+Resolution of /batch items: path placeholders come from the client and
+must stay inside their own path segment, so a batch can only reach the
+routes listed in BATCH_RESOURCES.
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core_service.batch import Batcher, BatchError, resolve
+
+
+def test_placeholder_fills_path_segment():
+    item_id, service, path, params, timeout = resolve(
+        {"resource": "technical", "params": {"symbol": "NABIL", "fields": "close"}})
+    assert (item_id, service, path, params) == ("technical", "technical", "/technical/NABIL", {"fields": "close"})
+
+
+def test_placeholder_is_escaped():
+    _, _, path, _, _ = resolve({"resource": "stock-chart", "params": {"symbol": "A B?x=1#y"}})
+    assert path == "/stock-chart/A%20B%3Fx%3D1%23y"
+
+
+@pytest.mark.parametrize("symbol", [
+    "../refresh-technical", "..", "a/b", "%2e%2e/x", "..%2frefresh-technical", "a\\b", "",
+])
+def test_placeholder_cannot_leave_its_segment(symbol):
+    with pytest.raises(BatchError):
+        resolve({"resource": "technical", "params": {"symbol": symbol, "full": "true"}})
+
+
+def test_traversal_never_reaches_another_route():
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.raw_path)
+        return httpx.Response(200, json={})
+
+    async def run(items):
+        batcher = Batcher(app=None)
+        batcher.set_transport("technical", httpx.MockTransport(handler))
+        try:
+            return await batcher.run(items)
+        finally:
+            await batcher.close()
+
+    with pytest.raises(BatchError):
+        asyncio.run(run([{"resource": "technical", "params": {"symbol": "../refresh-technical", "full": "true"}}]))
+    asyncio.run(run([{"resource": "technical", "params": {"symbol": "%2e%2e"}}]))
+    assert seen == [b"/technical/%252e%252e"]
@@ -0,0 +1,104 @@
+"""
+Parity of the vectorized technical engine with the per-symbol loop it
+replaced (logic.build_tables_per_symbol), of the whole-history event scan
+with the last-bar detectors, and of incremental refreshes with full rebuilds.
+
+Engine and event comparisons are exact (compare_tables defaults to atol=0):
+the engine rounds with Python's round, like the loop, and its moving
+averages restart their running sums at every symbol, so there is no
+one-cent slack. Incremental refreshes sum the new bars' windows on their
+own, so they are held to incremental.INDICATOR_ATOL (1e-9) on the
+indicators; their tables may only differ by the one cent a last-ulp
+difference can make on a half-way value (incremental.TABLE_ATOL).
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import make_history, without_last_day
+from technical_service import engine, events, incremental
+from technical_service.engine import prepare_history
+
+# two years: enough bars for SMA200 crossovers and the 52-week window
+SEEDS = [0, 1, 2]
+
+
+@pytest.fixture(scope="module", params=SEEDS)
+def sheet(request):
+    return make_history(symbols=120, years=2, seed=request.param)
+
+
+def _clean(report):
+    return {name: count for name, count in report.items() if count}
+
+
+def test_tables_match_per_symbol_loop(sheet):
+    report = engine.check_parity(prepare_history(sheet.copy()))
+    assert set(report) == set(engine.TABLES)
+    assert _clean(report) == {}
+
+
+def test_events_match_last_bar_detectors(sheet):
+    assert _clean(events.check_parity(prepare_history(sheet.copy()))) == {}
+
+
+def _assert_consistent(report):
+    assert _clean(report["table_mismatches"]) == {}
+    assert _clean(report["nan_mismatches"]) == {}
+    assert max(report["max_abs_diff"].values()) <= incremental.INDICATOR_ATOL
+    assert report["consistent"], report
+
+
+def test_incremental_append_matches_full_rebuild(sheet):
+    prev = incremental.full_indicators(prepare_history(without_last_day(sheet).copy()))
+    df = prepare_history(sheet.copy())
+    _, _, stats = incremental.update_indicators(prev, df)
+    assert stats["mode"] == "incremental" and stats["appended"] > 0 and stats["rebuilt"] == 0
+
+    _assert_consistent(incremental.check_incremental(prev, df))
+
+
+def test_incremental_edited_row_matches_full_rebuild(sheet):
+    prev = incremental.full_indicators(prepare_history(without_last_day(sheet).copy()))
+    edited = sheet.copy()
+    # an old bar of one symbol is corrected upstream: that symbol is rebuilt
+    row = edited.index[edited["Symbol"] == edited["Symbol"].iloc[0]][10]
+    edited.loc[row, "Close"] = round(edited.loc[row, "Close"] + 1.5, 2)
+    df = prepare_history(edited)
+    _, _, stats = incremental.update_indicators(prev, df)
+    assert stats["rebuilt"] == 1
+
+    _assert_consistent(incremental.check_incremental(prev, df))
+
+
+def test_rounding_follows_python_round():
+    # half-way values where np.round and round disagree by a cent
+    values = [410.695, 2058.105, 261.755, 467.105, 1.005]
+    assert engine._round(values, 2).tolist() == [round(v, 2) for v in values]
+    assert np.round(values, 2).tolist() != [round(v, 2) for v in values]
+
+
+def test_rolling_means_restart_per_symbol():
+    # a whole-column rolling mean carries rounding error across symbols
+    sheet = make_history(symbols=40, years=2, seed=3)
+    hist, (names, starts, ends) = engine.compute_indicators(engine.indicator_universe(prepare_history(sheet)))
+    close = engine.float_values(hist["close"])
+    for start, end in zip(starts, ends):
+        expected = np.asarray(hist["ma20"].iloc[start:end])
+        actual = pd.Series(close[start:end]).rolling(20).mean().to_numpy()
+        np.testing.assert_array_equal(expected, actual)
+
+
+def test_incremental_reads_only_new_windows():
+    # two new sessions per symbol: the second one's windows include the first
+    sheet = make_history(symbols=60, years=2, seed=4)
+    dates = sorted(sheet["Date"].unique())
+    prev = incremental.full_indicators(prepare_history(sheet[sheet["Date"] < dates[-2]].copy()))
+    df = prepare_history(sheet.copy())
+    _, _, stats = incremental.update_indicators(prev, df)
+    assert stats["rebuilt"] == 0 and stats["appended"] > 0
+    _assert_consistent(incremental.check_incremental(prev, df))